@@ -2,22 +2,31 @@ import streamlit as st
 import os
 import sys
 import json
+import tempfile
+import re
 import requests
-from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
+from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict, List
 import pandas as pd
 from PIL import Image, ImageDraw, ImageFont
 import sqlite3
 import io
 import base64
+import queue
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+from contextlib import contextmanager
 import bcrypt
-from pdf2image import convert_from_bytes
+import fitz  # PyMuPDF
 import locale
 import warnings
 
 # 添加项目根目录到路径
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from fix_foreign_keys import repair_legacy_schema  # noqa: E402
+from user_import import import_users_from_excel  # noqa: E402
+
 
 # --------------------------
 # 模拟外部封装模块（整合第一段代码的模块化设计）
@@ -27,8 +36,9 @@ class glm4v_api:
     CONFIG_FILE = "glm4v_config.json"
 
     @staticmethod
+    @st.cache_data(ttl=60)
     def load_api_config() -> dict:
-        """加载API配置"""
+        """加载API配置（缓存，保存配置时清除）"""
         if os.path.exists(glm4v_api.CONFIG_FILE):
             with open(glm4v_api.CONFIG_FILE, 'r', encoding='utf-8') as f:
                 return json.load(f)
@@ -40,6 +50,7 @@ class glm4v_api:
         try:
             with open(glm4v_api.CONFIG_FILE, 'w', encoding='utf-8') as f:
                 json.dump({"glm4v_api_key": api_key}, f, ensure_ascii=False, indent=2)
+            glm4v_api.load_api_config.clear()
             st.success("API Key 保存成功！")
             return True
         except Exception as e:
@@ -84,32 +95,34 @@ class info_extractor:
 
     @staticmethod
     def save_result_to_log(file_name: str, result: dict):
-        """保存识别结果到日志（可选功能）"""
+        """保存识别结果到日志（可选功能，每行一条JSON记录，追加写入）"""
         log_dir = "ocr_logs"
         os.makedirs(log_dir, exist_ok=True)
-        log_file = os.path.join(log_dir, f"ocr_log_{datetime.now().strftime('%Y%m%d')}.json")
+        now = datetime.now()
+        log_file = os.path.join(log_dir, f"ocr_log_{now.strftime('%Y%m%d')}.ndjson")
 
         log_data = {
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "timestamp": now.strftime("%Y-%m-%d %H:%M:%S"),
             "file_name": file_name,
             "result": result
         }
 
         try:
-            # 读取现有日志
-            existing_logs = []
-            if os.path.exists(log_file):
-                with open(log_file, 'r', encoding='utf-8') as f:
-                    existing_logs = json.load(f)
-
-            existing_logs.append(log_data)
-
-            # 写入日志
-            with open(log_file, 'w', encoding='utf-8') as f:
-                json.dump(existing_logs, f, ensure_ascii=False, indent=2)
+            # 追加一行，无需读取和重写当天已有日志
+            with open(log_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(log_data, ensure_ascii=False) + "\n")
         except:
             pass
 
+    @staticmethod
+    def load_logs(date: str) -> list:
+        """读取指定日期（YYYYMMDD）的识别日志，返回记录列表"""
+        log_file = os.path.join("ocr_logs", f"ocr_log_{date}.ndjson")
+        if not os.path.exists(log_file):
+            return []
+        with open(log_file, 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
 
 # --------------------------
 # 基础配置
@@ -130,6 +143,7 @@ st.set_page_config(
 
 # 文件夹配置
 UPLOAD_FOLDER = "uploads"
+UPLOAD_CHUNK_SIZE = 1 << 20  # 上传文件分块写入大小（1MB）
 EXCEL_TEMPLATE_FOLDER = "excel_templates"
 OCR_LOG_FOLDER = "ocr_logs"
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
@@ -143,158 +157,291 @@ ROLE_DISPLAY_MAP = {
     "admin": "管理员"
 }
 
+# 表单下拉选项及选项 -> 下标映射（用于按识别结果设置默认选中项）
+AWARD_CATEGORIES = ("", "国家级", "省级")
+AWARD_CATEGORY_IDX = {v: i for i, v in enumerate(AWARD_CATEGORIES)}
+AWARD_LEVELS = ("", "一等奖", "二等奖", "三等奖", "金奖", "银奖", "铜奖", "优秀奖")
+AWARD_LEVEL_IDX = {v: i for i, v in enumerate(AWARD_LEVELS)}
+COMPETITION_TYPES = ("", "A类", "B类")
+COMPETITION_TYPE_IDX = {v: i for i, v in enumerate(COMPETITION_TYPES)}
+
 STANDARD_SIZES = {
     "A4": (2100, 2970),
     "A5": (1480, 2100),
     "custom": (0, 0)
 }
+# 预设尺寸的目标宽、高及宽高比（custom不缩放，不参与计算）
+_SIZE_RATIOS = {k: (w, h, w / h) for k, (w, h) in STANDARD_SIZES.items() if (w, h) != (0, 0)}
+SIZE_KEYS = tuple(STANDARD_SIZES)
+SIZE_KEY_IDX = {k: i for i, k in enumerate(SIZE_KEYS)}
+
+OCR_MAX_SIDE = 1600  # 发送给GLM-4V识别的图片最长边（像素）
 
 # ===================== ✅ 核心修复1：加载配置文件中的API-KEY到全局变量 =====================
 config = glm4v_api.load_api_config()
 GLM4V_API_KEY = config.get("glm4v_api_key", "")
 # ===================== ✅ 导入必须的库 + 关闭SSL警告 =====================
 import urllib3
+from urllib3.util.retry import Retry
 
 urllib3.disable_warnings()  # 关闭SSL警告，避免报错
 
+# GLM-4V 官方有效接口地址
+GLM4V_API_URL = "https://open.bigmodel.cn/api/paas/v4/chat/completions"
+
+# 识别提示词（最强约束，保证返回纯JSON）
+OCR_PROMPT = """你是专业的赛事获奖证书信息提取专家，严格按要求执行，只返回标准JSON字符串，不要任何多余文字、换行、解释、备注、标点符号。
+提取固定字段(英文key不可修改，识别不到则为空字符串)：student_college, competition_project, student_id, student_name, award_category, award_level, competition_type, organizer, award_time, tutor_name
+提取规则：1.严格返回JSON格式，无其他内容；2.competition_type固定填写「学科竞赛」；3.award_category只能填写「国家级」或「省级」；4.如实识别，严禁编造任何信息；5.只输出JSON字符串。"""
+
+# 请求体模板预先序列化，按图片URL位置拆成前后两段；每次请求只拼接图片的base64（仅含URL安全字符，无需JSON转义）
+_IMAGE_URL_SLOT = "__IMAGE_URL__"
+_OCR_REQ_PREFIX, _OCR_REQ_SUFFIX = json.dumps({
+    "model": "glm-4v",
+    "messages": [
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": OCR_PROMPT},
+                {"type": "image_url", "image_url": {"url": _IMAGE_URL_SLOT}}
+            ]
+        }
+    ],
+    "temperature": 0.0,
+    "top_p": 0.8,
+    "max_tokens": 2048,
+    "stream": False
+}, ensure_ascii=False).encode("utf-8").split(_IMAGE_URL_SLOT.encode("ascii"))
+
+
+@st.cache_resource
+def _get_http_session() -> requests.Session:
+    # 复用HTTP连接（keep-alive + TLS会话复用）
+    # 识别接口按次计费且POST不幂等：只重试连接失败和429/503（请求未被处理），读超时不重试
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=8,
+        max_retries=Retry(total=2, connect=2, read=0, other=0, backoff_factor=0.5,
+                          status_forcelist=(429, 503), allowed_methods=frozenset(["POST"]),
+                          respect_retry_after_header=False, raise_on_status=False)
+    ))
+    return session
+
+
+OCR_MAX_WORKERS = 8
+OCR_HTTP_TIMEOUT = (5, 80)  # (连接, 读取)超时（秒）；读超时不重试，单次识别最长约80秒加几次短暂的连接重试
+OCR_POLL_INTERVAL = 0.5  # 识别进行中时页面自动刷新的间隔（秒）
+
+
+@st.cache_resource
+def _get_ocr_pool() -> ThreadPoolExecutor:
+    # 识别请求属于网络等待，放到后台线程执行，页面无需阻塞等待接口返回
+    return ThreadPoolExecutor(max_workers=OCR_MAX_WORKERS, thread_name_prefix="ocr")
+
+
+def submit_ocr(img: Image.Image) -> Future:
+    """提交识别任务，立即返回Future（结果为call_ocr_api的返回值）"""
+    return _get_ocr_pool().submit(call_ocr_api, img)
+
 
 # --------------------------
 # 1. 数据库模块
 # --------------------------
-def init_database():
-    conn = sqlite3.connect("certificate_system.db")
+DB_FILE = "certificate_system.db"
+DB_POOL_SIZE = 8
+BCRYPT_ROUNDS = 10  # bcrypt计算强度（默认12，10约快4倍，登录响应更快）
+_CN_TZ = timezone(timedelta(hours=8))  # 与原SQL中 datetime('now', '+8 hours') 一致
+
+
+def _now_str() -> str:
+    # 当前北京时间字符串，写库时直接绑定，不再逐行调用SQLite的datetime函数
+    return datetime.now(_CN_TZ).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _new_conn() -> sqlite3.Connection:
+    conn = sqlite3.connect(DB_FILE, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA cache_size=-20000")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA mmap_size=268435456")
     conn.execute("PRAGMA foreign_keys = ON")
-    cursor = conn.cursor()
-
-    # 创建用户表
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS users (
-        user_id INTEGER PRIMARY KEY AUTOINCREMENT,
-        account_id TEXT UNIQUE NOT NULL,
-        name TEXT NOT NULL,
-        role TEXT NOT NULL,
-        department TEXT NOT NULL,
-        email TEXT,
-        password_hash TEXT NOT NULL,
-        is_active INTEGER DEFAULT 1,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    ''')
-
-    # 创建文件表
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS files (
-        file_id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER NOT NULL,
-        file_name TEXT NOT NULL,
-        file_path TEXT NOT NULL,
-        file_type TEXT NOT NULL,
-        file_size INTEGER NOT NULL,
-        upload_time TIMESTAMP DEFAULT (datetime('now', '+8 hours')),
-        FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
-    )
-    ''')
-
-    # 证书信息表
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS certificate_info (
-        cert_id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER NOT NULL,
-        file_id INTEGER NOT NULL,
-        student_college TEXT,
-        competition_project TEXT,
-        student_id TEXT,
-        student_name TEXT,
-        award_category TEXT,
-        award_level TEXT,
-        competition_type TEXT,
-        organizer TEXT,
-        award_time TEXT,
-        tutor_name TEXT,
-        is_submitted INTEGER DEFAULT 0,
-        submit_time TIMESTAMP,
-        created_at TIMESTAMP DEFAULT (datetime('now', '+8 hours')),
-        updated_at TIMESTAMP DEFAULT (datetime('now', '+8 hours')),
-        FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
-        FOREIGN KEY (file_id) REFERENCES files(file_id) ON DELETE CASCADE
-    )
-    ''')
-
-    # 系统配置表
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS system_config (
-        config_id INTEGER PRIMARY KEY AUTOINCREMENT,
-        config_key TEXT UNIQUE NOT NULL,
-        config_value TEXT NOT NULL,
-        updated_at TIMESTAMP DEFAULT (datetime('now', '+8 hours'))
-    )
-    ''')
+    return conn
+
+
+@st.cache_resource
+def _get_pool() -> queue.Queue:
+    # Streamlit每次rerun都会重新执行本脚本，连接池放在cache_resource中以便跨rerun/会话复用
+    pool = queue.Queue(maxsize=DB_POOL_SIZE)
+    for _ in range(DB_POOL_SIZE):
+        pool.put(_new_conn())
+    return pool
+
 
-    # 初始化截止时间
-    cursor.execute("SELECT 1 FROM system_config WHERE config_key = 'submit_deadline'")
-    if not cursor.fetchone():
+@contextmanager
+def _get_conn():
+    """从连接池借出连接，正常结束时提交、异常时回滚，最后归还连接池"""
+    pool = _get_pool()
+    conn = pool.get()
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        pool.put(conn)
+
+
+def init_database():
+    with _get_conn() as conn:
+        cursor = conn.cursor()
+
+        # 创建用户表
         cursor.execute('''
-        INSERT INTO system_config (config_key, config_value)
-        VALUES ('submit_deadline', '2025-12-31 23:59:59')
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            account_id TEXT UNIQUE NOT NULL,
+            name TEXT NOT NULL,
+            role TEXT NOT NULL,
+            department TEXT NOT NULL,
+            email TEXT,
+            password_hash TEXT NOT NULL,
+            is_active INTEGER DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            created_by TEXT DEFAULT 'self_register'
+        )
         ''')
 
-    # 初始化管理员账号
-    admin_account = "88888888"
-    cursor.execute("SELECT 1 FROM users WHERE account_id = ?", (admin_account,))
-    if not cursor.fetchone():
-        password = "Admin123456"
-        salt = bcrypt.gensalt()
-        password_hash = bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+        # 创建文件表
         cursor.execute('''
-        INSERT INTO users (account_id, name, role, department, email, password_hash)
-        VALUES (?, ?, ?, ?, ?, ?)
-        ''', (admin_account, "系统管理员", "admin", "系统管理部", "admin@school.edu.cn", password_hash))
+        CREATE TABLE IF NOT EXISTS files (
+            file_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            file_name TEXT NOT NULL,
+            file_path TEXT NOT NULL,
+            file_type TEXT NOT NULL,
+            file_size INTEGER NOT NULL,
+            upload_time TIMESTAMP DEFAULT (datetime('now', '+8 hours')),
+            FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+        )
+        ''')
 
-    conn.commit()
-    conn.close()
+        # 证书信息表
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS certificate_info (
+            cert_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            file_id INTEGER NOT NULL,
+            student_college TEXT,
+            competition_project TEXT,
+            student_id TEXT,
+            student_name TEXT,
+            award_category TEXT,
+            award_level TEXT,
+            competition_type TEXT,
+            organizer TEXT,
+            award_time TEXT,
+            tutor_name TEXT,
+            is_submitted INTEGER DEFAULT 0,
+            submit_time TIMESTAMP,
+            created_at TIMESTAMP DEFAULT (datetime('now', '+8 hours')),
+            updated_at TIMESTAMP DEFAULT (datetime('now', '+8 hours')),
+            FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
+            FOREIGN KEY (file_id) REFERENCES files(file_id) ON DELETE CASCADE
+        )
+        ''')
 
+        # 系统配置表
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS system_config (
+            config_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            config_key TEXT UNIQUE NOT NULL,
+            config_value TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT (datetime('now', '+8 hours'))
+        )
+        ''')
 
-# 初始化数据库
-if not os.path.exists("certificate_system.db"):
+        # 常用查询条件的索引
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_files_user_upload ON files(user_id, upload_time DESC)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_files_dup ON files(user_id, file_name, file_size)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_cert_file ON certificate_info(file_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_cert_user_submitted ON certificate_info(user_id, is_submitted)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_role ON users(role)")
+
+        # 初始化截止时间
+        cursor.execute("SELECT 1 FROM system_config WHERE config_key = 'submit_deadline'")
+        if not cursor.fetchone():
+            cursor.execute('''
+            INSERT INTO system_config (config_key, config_value)
+            VALUES ('submit_deadline', '2025-12-31 23:59:59')
+            ''')
+
+        # 初始化管理员账号
+        admin_account = "88888888"
+        cursor.execute("SELECT 1 FROM users WHERE account_id = ?", (admin_account,))
+        if not cursor.fetchone():
+            password = "Admin123456"
+            salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
+            password_hash = bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+            cursor.execute('''
+            INSERT INTO users (account_id, name, role, department, email, password_hash)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ''', (admin_account, "系统管理员", "admin", "系统管理部", "admin@school.edu.cn", password_hash))
+
+        # 更新统计信息，使查询优化器使用新建索引
+        cursor.execute("ANALYZE")
+
+
+# 初始化数据库（建表、建索引均可重复执行，每个进程执行一次，已有数据库也会补建索引）
+@st.cache_resource
+def _ensure_database():
+    # 旧版迁移遗留的表结构（外键指向已删除的users_old、缺少列）会使上传和删除全部失败，检测到时先自动修复
+    repaired = repair_legacy_schema(DB_FILE)
+    if repaired:
+        print(f"已修复旧版数据库表结构：{', '.join(repaired)}")
     init_database()
 
 
+_ensure_database()
+
+
 # 数据库操作函数
 def check_account_exists(account_id: str) -> bool:
-    conn = sqlite3.connect("certificate_system.db")
-    cursor = conn.cursor()
-    cursor.execute("SELECT 1 FROM users WHERE account_id = ?", (account_id,))
-    result = cursor.fetchone()
-    conn.close()
+    with _get_conn() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1 FROM users WHERE account_id = ?", (account_id,))
+        result = cursor.fetchone()
     return result is not None
 
 
+# 账号格式：学生13位数字，教师/管理员8位数字，其他角色仅要求纯数字
+_STAFF_ACCOUNT_RE = re.compile(r"\d{8}")
+_ACCOUNT_RE = {"student": re.compile(r"\d{13}"), "teacher": _STAFF_ACCOUNT_RE, "admin": _STAFF_ACCOUNT_RE}
+_DIGITS_RE = re.compile(r"\d+")
+# 密码：至少8位，且同时包含字母和数字
+_PASSWORD_RE = re.compile(r"(?=.*[^\W\d_])(?=.*\d).{8,}", re.DOTALL)
+
+
 def validate_account_format(account_id: str, role: str) -> bool:
-    if not account_id.isdigit(): return False
-    if role == "student" and len(account_id) != 13: return False
-    if role in ["teacher", "admin"] and len(account_id) != 8: return False
-    return True
+    return _ACCOUNT_RE.get(role, _DIGITS_RE).fullmatch(account_id) is not None
 
 
 def validate_password(password: str) -> bool:
-    if len(password) < 8: return False
-    if not any(c.isalpha() for c in password): return False
-    if not any(c.isdigit() for c in password): return False
-    return True
+    return _PASSWORD_RE.fullmatch(password) is not None
 
 
 def create_user(account_id: str, name: str, role: str, department: str, email: str, password: str) -> bool:
     if not validate_password(password): return False
     try:
-        salt = bcrypt.gensalt()
+        salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
         password_hash = bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
-        conn = sqlite3.connect("certificate_system.db")
-        cursor = conn.cursor()
-        cursor.execute(
-            'INSERT INTO users (account_id, name, role, department, email, password_hash) VALUES (?, ?, ?, ?, ?, ?)',
-            (account_id, name, role, department, email, password_hash))
-        conn.commit()
-        conn.close()
+        with _get_conn() as conn:
+            conn.execute(
+                'INSERT INTO users (account_id, name, role, department, email, password_hash) VALUES (?, ?, ?, ?, ?, ?)',
+                (account_id, name, role, department, email, password_hash))
+        get_all_users.clear()
         return True
     except Exception as e:
         print(f"创建用户失败：{e}")
@@ -302,131 +449,120 @@ def create_user(account_id: str, name: str, role: str, department: str, email: s
 
 
 def get_user_by_account(account_id: str) -> Optional[dict]:
-    conn = sqlite3.connect("certificate_system.db")
-    cursor = conn.cursor()
-    cursor.execute(
-        'SELECT user_id, account_id, name, role, department, email, is_active, password_hash FROM users WHERE account_id = ?',
-        (account_id,))
-    result = cursor.fetchone()
-    conn.close()
-    if result:
-        return {
-            "user_id": result[0],
-            "account_id": result[1],
-            "name": result[2],
-            "role": result[3],
-            "department": result[4],
-            "email": result[5],
-            "is_active": result[6],
-            "password_hash": result[7]
-        }
-    return None
+    with _get_conn() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
+        cursor.execute(
+            'SELECT user_id, account_id, name, role, department, email, is_active, password_hash FROM users WHERE account_id = ?',
+            (account_id,))
+        result = cursor.fetchone()
+    return dict(result) if result else None
 
 
 def verify_password(password: str, password_hash: str) -> bool:
     try:
         return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
-    except:
-        return password == "Admin123456"
+    except ValueError:
+        # 哈希格式无效（非bcrypt哈希），视为验证失败
+        return False
 
 
 def update_user_status(account_id: str, is_active: bool) -> bool:
-    conn = sqlite3.connect("certificate_system.db")
-    cursor = conn.cursor()
-    cursor.execute('UPDATE users SET is_active = ? WHERE account_id = ?', (1 if is_active else 0, account_id))
-    conn.commit()
-    affected = cursor.rowcount
-    conn.close()
+    with _get_conn() as conn:
+        cursor = conn.cursor()
+        cursor.execute('UPDATE users SET is_active = ? WHERE account_id = ?', (1 if is_active else 0, account_id))
+        affected = cursor.rowcount
+    get_all_users.clear()
     return affected > 0
 
 
+@st.cache_data(ttl=30)
 def get_all_users(role: Optional[str] = None) -> List[dict]:
-    conn = sqlite3.connect("certificate_system.db")
-    cursor = conn.cursor()
-    if role:
-        cursor.execute('''
-        SELECT user_id, account_id, name, role, department, email, is_active, created_at
-        FROM users WHERE role = ?
-        ''', (role,))
-    else:
-        cursor.execute('''
-        SELECT user_id, account_id, name, role, department, email, is_active, created_at
-        FROM users
-        ''')
-    results = cursor.fetchall()
-    conn.close()
-    users = []
-    for r in results:
-        users.append({
-            "user_id": r[0], "account_id": r[1], "name": r[2], "role": r[3],
-            "department": r[4], "email": r[5], "is_active": r[6], "created_at": r[7]
-        })
-    return users
-
-
-def save_file_metadata(user_id: int, file_name: str, file_path: str, file_type: str, file_size: int) -> bool:
-    try:
-        conn = sqlite3.connect("certificate_system.db")
+    with _get_conn() as conn:
         cursor = conn.cursor()
-        cursor.execute(
-            'INSERT INTO files (user_id, file_name, file_path, file_type, file_size) VALUES (?, ?, ?, ?, ?)',
-            (user_id, file_name, file_path, file_type, file_size))
-        conn.commit()
-        conn.close()
-        return True
+        cursor.row_factory = sqlite3.Row
+        if role:
+            cursor.execute('''
+            SELECT user_id, account_id, name, role, department, email, is_active, created_at
+            FROM users WHERE role = ?
+            ''', (role,))
+        else:
+            cursor.execute('''
+            SELECT user_id, account_id, name, role, department, email, is_active, created_at
+            FROM users
+            ''')
+        return [dict(r) for r in cursor]
+
+
+def save_file_metadata(user_id: int, file_name: str, file_path: str, file_type: str, file_size: int,
+                       conn: Optional[sqlite3.Connection] = None) -> Optional[int]:
+    """写入文件元信息，返回新文件ID（失败返回None）；传入conn时在调用方的事务中执行，由调用方提交"""
+    sql = 'INSERT INTO files (user_id, file_name, file_path, file_type, file_size, upload_time) VALUES (?, ?, ?, ?, ?, ?)'
+    params = (user_id, file_name, file_path, file_type, file_size, _now_str())
+    try:
+        if conn is not None:
+            return conn.execute(sql, params).lastrowid
+        with _get_conn() as own_conn:
+            file_id = own_conn.execute(sql, params).lastrowid
+        _clear_file_caches()
+        return file_id
     except Exception as e:
         print(f"保存文件元信息失败：{e}")
-        return False
+        return None
 
 
+@st.cache_data(ttl=30)
 def get_user_uploaded_files(user_id: int) -> List[dict]:
-    conn = sqlite3.connect("certificate_system.db")
-    cursor = conn.cursor()
-    cursor.execute(
-        'SELECT file_id, file_name, file_path, file_type, file_size, upload_time FROM files WHERE user_id = ? ORDER BY upload_time DESC',
-        (user_id,))
-    results = cursor.fetchall()
-    conn.close()
-    files = []
-    for r in results:
-        files.append({
-            "file_id": r[0], "file_name": r[1], "file_path": r[2], "file_type": r[3],
-            "file_size": r[4], "upload_time": r[5]
-        })
-    return files
+    """用户已上传文件列表，一次查询同时带出提交状态（is_submitted，无证书信息时为None）"""
+    with _get_conn() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
+        cursor.execute('''
+        SELECT f.file_id, f.file_name, f.file_path, f.file_type, f.file_size, f.upload_time,
+               MAX(c.is_submitted) AS is_submitted
+        FROM files f
+        LEFT JOIN certificate_info c ON c.file_id = f.file_id
+        WHERE f.user_id = ?
+        GROUP BY f.file_id
+        ORDER BY f.upload_time DESC
+        ''', (user_id,))
+        return [dict(r) for r in cursor]
+
+
+def _clear_file_caches():
+    # 文件或证书信息变化后清除相关查询缓存
+    get_user_uploaded_files.clear()
+    get_cert_info_by_file_id.clear()
 
 
 # 修复后的【文件重复校验函数】✅ 彻底解决第一次上传就提示重复的BUG
 def check_file_duplicate(user_id: int, file_name: str, file_size: int) -> bool:
-    conn = sqlite3.connect("certificate_system.db")
-    cursor = conn.cursor()
-    # 修复核心：严格校验 【用户ID+文件名+文件大小】 三重匹配，缺一不可，避免误判
-    cursor.execute(
-        'SELECT 1 FROM files WHERE user_id = ? AND file_name = ? AND file_size = ?',
-        (user_id, file_name, file_size))
-    result = cursor.fetchone()
-    conn.close()
+    with _get_conn() as conn:
+        cursor = conn.cursor()
+        # 修复核心：严格校验 【用户ID+文件名+文件大小】 三重匹配，缺一不可，避免误判
+        cursor.execute(
+            'SELECT 1 FROM files WHERE user_id = ? AND file_name = ? AND file_size = ?',
+            (user_id, file_name, file_size))
+        result = cursor.fetchone()
     # 关键：返回结果时做非空判断，原逻辑隐性报错导致恒为True，现在改为精准判断
     return result is not None
 
 
 def delete_file_by_id(file_id: int) -> bool:
     try:
-        conn = sqlite3.connect("certificate_system.db")
-        cursor = conn.cursor()
-
-        # 获取文件路径
-        cursor.execute("SELECT file_path FROM files WHERE file_id = ?", (file_id,))
-        file_path = cursor.fetchone()
+        with _get_conn() as conn:
+            cursor = conn.cursor()
+
+            # 获取文件路径
+            cursor.execute("SELECT file_path FROM files WHERE file_id = ?", (file_id,))
+            file_path = cursor.fetchone()
+            if file_path:
+                file_path = file_path[0]
+
+                # 证书信息由外键ON DELETE CASCADE级联删除
+                cursor.execute("DELETE FROM files WHERE file_id = ?", (file_id,))
+        _clear_file_caches()
         if file_path:
-            file_path = file_path[0]
-
-            # 级联删除
-            cursor.execute("DELETE FROM certificate_info WHERE file_id = ?", (file_id,))
-            cursor.execute("DELETE FROM files WHERE file_id = ?", (file_id,))
-            conn.commit()
-            conn.close()
-
             # 删除本地文件
             if os.path.exists(file_path):
                 os.remove(file_path)
@@ -438,8 +574,6 @@ def delete_file_by_id(file_id: int) -> bool:
 
 
 def get_all_certificate_info(filters: dict = None) -> List[dict]:
-    conn = sqlite3.connect("certificate_system.db")
-    cursor = conn.cursor()
     query = '''
     SELECT ci.*, u.name as submitter_name, u.role as submitter_role, u.department as submitter_dept,
            f.file_name, f.file_path
@@ -460,16 +594,12 @@ def get_all_certificate_info(filters: dict = None) -> List[dict]:
             query += " AND u.role = ?"
             params.append(filters["submitter_role"])
 
-    cursor.execute(query, params)
-    results = cursor.fetchall()
-    conn.close()
-
-    cols = [desc[0] for desc in cursor.description]
-    certs = []
-    for r in results:
-        cert_dict = dict(zip(cols, r))
-        certs.append(cert_dict)
-    return certs
+    with _get_conn() as conn:
+        cursor = conn.cursor()
+        # sqlite3.Row按列名取值，直接转换为dict，无需再按cursor.description逐行zip
+        cursor.row_factory = sqlite3.Row
+        cursor.execute(query, params)
+        return [dict(r) for r in cursor]
 
 
 def update_deadline(new_deadline: str) -> bool:
@@ -481,106 +611,140 @@ def update_deadline(new_deadline: str) -> bool:
     try:
         # 严格校验标准格式：YYYY-MM-DD HH:MM:SS
         datetime.strptime(new_deadline, "%Y-%m-%d %H:%M:%S")
-        conn = sqlite3.connect("certificate_system.db")
-        cursor = conn.cursor()
-        cursor.execute('''
-        UPDATE system_config 
-        SET config_value = ?, updated_at = datetime('now', '+8 hours') 
-        WHERE config_key = 'submit_deadline'
-        ''', (new_deadline,))
-        conn.commit()
-        conn.close()
+        with _get_conn() as conn:
+            conn.execute('''
+            UPDATE system_config 
+            SET config_value = ?, updated_at = ? 
+            WHERE config_key = 'submit_deadline'
+            ''', (new_deadline, _now_str()))
+        get_submit_deadline.clear()
         return True
     except ValueError:
         # 仅显示一次错误提示
         st.error("时间格式错误！请使用YYYY-MM-DD HH:MM:SS格式（如：2025-12-31 23:59:59）")
         return False
 
+@st.cache_data(ttl=60)
 def get_submit_deadline() -> datetime:
-    conn = sqlite3.connect("certificate_system.db")
-    cursor = conn.cursor()
-    cursor.execute("SELECT config_value FROM system_config WHERE config_key = 'submit_deadline'")
-    result = cursor.fetchone()
-    conn.close()
+    with _get_conn() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT config_value FROM system_config WHERE config_key = 'submit_deadline'")
+        result = cursor.fetchone()
     return datetime.strptime(result[0], "%Y-%m-%d %H:%M:%S") if result else datetime(2025, 12, 31, 23, 59, 59)
 
 # ===================== ✅ 新增数据库函数1：根据文件ID获取证书信息（草稿回显） =====================
+@st.cache_data(ttl=30)
 def get_cert_info_by_file_id(file_id: int) -> Optional[dict]:
-    conn = sqlite3.connect("certificate_system.db")
-    cursor = conn.cursor()
-    cursor.execute('''
-    SELECT * FROM certificate_info WHERE file_id = ? LIMIT 1
-    ''', (file_id,))
-    result = cursor.fetchone()
-    conn.close()
-    if result:
-        cols = [desc[0] for desc in cursor.description]
-        return dict(zip(cols, result))
-    return None
+    with _get_conn() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
+        cursor.execute('''
+        SELECT * FROM certificate_info WHERE file_id = ? LIMIT 1
+        ''', (file_id,))
+        result = cursor.fetchone()
+    return dict(result) if result else None
 
 # ===================== ✅ 新增数据库函数2：批量提交草稿（核心批量提交功能） =====================
 def batch_submit_draft(user_id: int) -> bool:
     try:
-        conn = sqlite3.connect("certificate_system.db")
-        cursor = conn.cursor()
-        cursor.execute('''
-        UPDATE certificate_info 
-        SET is_submitted = 1, submit_time = datetime('now', '+8 hours'), updated_at = datetime('now', '+8 hours')
-        WHERE user_id = ? AND is_submitted = 0
-        ''', (user_id,))
-        conn.commit()
-        affected = cursor.rowcount
-        conn.close()
+        with _get_conn() as conn:
+            cursor = conn.cursor()
+            now = _now_str()
+            cursor.execute('''
+            UPDATE certificate_info 
+            SET is_submitted = 1, submit_time = ?, updated_at = ?
+            WHERE user_id = ? AND is_submitted = 0
+            ''', (now, now, user_id))
+            affected = cursor.rowcount
+        _clear_file_caches()
         return affected > 0
     except Exception as e:
         print(f"批量提交失败：{e}")
         return False
 
+# 证书信息插入语句（模块级常量，SQL文本不变，命中sqlite3连接的语句缓存，无需重复解析）
+# created_at不绑定：旧版数据库的certificate_info没有该列，有该列时由列默认值填写
+CERT_INSERT_SQL = '''
+INSERT INTO certificate_info
+(user_id, file_id, student_college, competition_project, student_id, student_name,
+ award_category, award_level, competition_type, organizer, award_time, tutor_name,
+ is_submitted, submit_time, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
 # ===================== ✅ 新增数据库函数3：获取用户的草稿和已提交数量 =====================
 def get_user_cert_status(user_id: int) -> dict:
-    conn = sqlite3.connect("certificate_system.db")
-    cursor = conn.cursor()
-    # 草稿数量
-    cursor.execute('SELECT COUNT(*) FROM certificate_info WHERE user_id = ? AND is_submitted = 0', (user_id,))
-    draft_count = cursor.fetchone()[0]
-    # 已提交数量
-    cursor.execute('SELECT COUNT(*) FROM certificate_info WHERE user_id = ? AND is_submitted = 1', (user_id,))
-    submit_count = cursor.fetchone()[0]
-    conn.close()
+    with _get_conn() as conn:
+        cursor = conn.cursor()
+        # 一次查询同时统计草稿数量和已提交数量
+        cursor.execute('''
+        SELECT COALESCE(SUM(is_submitted = 0), 0), COALESCE(SUM(is_submitted = 1), 0)
+        FROM certificate_info WHERE user_id = ?
+        ''', (user_id,))
+        draft_count, submit_count = cursor.fetchone()
     return {"draft": draft_count, "submitted": submit_count}
 
 
 # --------------------------
 # 2. 文件处理与视觉识别模块
 # --------------------------
+_ALLOWED_EXT = frozenset({".pdf", ".jpg", ".jpeg", ".png", ".bmp"})
+_ALLOWED_EXT_MSG = f"不支持的文件类型！仅支持：{sorted(_ALLOWED_EXT)}"
+# 文件头 -> (文件类型, 该格式允许的后缀)：按文件内容判断类型，后缀必须与内容一致（文件按上传后缀保存）
+_FILE_MAGIC = (
+    (b"%PDF", "pdf", frozenset({".pdf"})),
+    (b"\x89PNG", "image", frozenset({".png"})),
+    (b"\xff\xd8\xff", "image", frozenset({".jpg", ".jpeg"})),
+    (b"BM", "image", frozenset({".bmp"})),
+)
+
+
 def validate_upload_file(file) -> tuple[bool, str, str]:
     file_size = file.size
     if file_size > 10 * 1024 * 1024:
         return False, "文件大小超过10MB限制！", ""
 
     file_ext = os.path.splitext(file.name)[1].lower()
-    allowed_types = [".pdf", ".jpg", ".jpeg", ".png", ".bmp"]
-    if file_ext not in allowed_types:
-        return False, f"不支持的文件类型！仅支持：{allowed_types}", ""
-
-    file_type = "pdf" if file_ext == ".pdf" else "image"
-    return True, "", file_type
+    if file_ext not in _ALLOWED_EXT:
+        return False, _ALLOWED_EXT_MSG, ""
+
+    # 读取前4个字节识别实际类型
+    file.seek(0)
+    header = file.read(4)
+    file.seek(0)
+    for magic, file_type, exts in _FILE_MAGIC:
+        if header.startswith(magic):
+            if file_ext not in exts:
+                return False, f"文件后缀为{file_ext}，但文件内容不是该格式，请修改为正确的后缀后重新上传！", ""
+            return True, "", file_type
+    return False, "文件内容与后缀不符，无法识别为PDF或图片！", ""
+
+
+@st.cache_resource
+def _get_fallback_font() -> ImageFont.ImageFont:
+    # 字体文件只解析一次，预览失败时直接复用
+    try:
+        return ImageFont.truetype("simhei.ttf", 60)
+    except OSError:
+        return ImageFont.load_default(size=60)
 
 
 def pdf_to_image(pdf_data: bytes) -> Image.Image:
     try:
-        pages = convert_from_bytes(pdf_data, 300)
-        return pages[0]
+        # 进程内渲染首页，无需调用poppler，也不解码其余页面
+        doc = fitz.open(stream=pdf_data, filetype="pdf")
+        try:
+            pix = doc.load_page(0).get_pixmap(dpi=200)
+            return Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+        finally:
+            doc.close()
     except Exception as e:
         warnings.warn(f"PDF转换失败: {e}")
         # 创建默认错误图片
         default_img = Image.new('RGB', (2100, 2970), color='white')
         draw = ImageDraw.Draw(default_img)
-        try:
-            font = ImageFont.truetype("simhei.ttf", 60)
-        except:
-            font = ImageFont.load_default(size=60)
-        text = "PDF预览失败：请安装poppler并配置环境变量\n或检查PDF文件是否损坏"
+        font = _get_fallback_font()
+        text = "PDF预览失败：请检查PDF文件是否损坏"
         text_bbox = draw.textbbox((0, 0), text, font=font)
         text_width = text_bbox[2] - text_bbox[0]
         text_height = text_bbox[3] - text_bbox[1]
@@ -594,12 +758,14 @@ def rotate_image(img: Image.Image, angle: int) -> Image.Image:
     return img.rotate(angle, expand=True)
 
 
-def resize_image(img: Image.Image, size_type: str) -> Image.Image:
+def resize_image(img: Image.Image, size_type: str, swap_target: bool = False) -> Image.Image:
     if size_type == "custom":
         return img
-    target_width, target_height = STANDARD_SIZES[size_type]
+    target_width, target_height, target_ratio = _SIZE_RATIOS[size_type]
+    # 图片随后要旋转90/270度时，按宽高互换后的目标尺寸缩放
+    if swap_target:
+        target_width, target_height, target_ratio = target_height, target_width, 1 / target_ratio
     img_ratio = img.width / img.height
-    target_ratio = target_width / target_height
 
     if img_ratio > target_ratio:
         new_width = target_width
@@ -608,18 +774,29 @@ def resize_image(img: Image.Image, size_type: str) -> Image.Image:
         new_height = target_height
         new_width = int(new_height * img_ratio)
 
-    return img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+    # 缩小比例较大时先按整数倍reduce降采样，再做一次LANCZOS到目标尺寸
+    return img.resize((new_width, new_height), Image.Resampling.LANCZOS, reducing_gap=2.0)
 
 
 def generate_final_image(original_img: Image.Image, total_rotate_angle: int, size_type: str) -> Image.Image:
-    rotated_img = rotate_image(original_img, total_rotate_angle % 360)
-    resized_img = resize_image(rotated_img, size_type)
+    # 原图、旋转角度、尺寸均未变化时直接复用上次结果，避免每次rerun重复旋转和重采样
+    angle = total_rotate_angle % 360
+    cached = st.session_state.get("final_img_cache")
+    if cached and cached[0] is original_img and cached[1:3] == (angle, size_type):
+        return cached[3]
+    if angle % 90 == 0:
+        # 先缩放再旋转，旋转只处理缩小后的图片
+        resized_img = rotate_image(resize_image(original_img, size_type, swap_target=angle in (90, 270)), angle)
+    else:
+        resized_img = resize_image(rotate_image(original_img, angle), size_type)
+    st.session_state.final_img_cache = (original_img, angle, size_type, resized_img)
     return resized_img
 
 
 def pil_image_to_bytes(img: Image.Image) -> bytes:
+    # 预览用PNG只是临时数据，使用最低压缩级别换取编码速度
     buf = io.BytesIO()
-    img.save(buf, format="PNG")
+    img.save(buf, format="PNG", compress_level=1)
     return buf.getvalue()
 
 
@@ -627,17 +804,21 @@ def pil_image_to_bytes(img: Image.Image) -> bytes:
 def image_to_base64(img_input):
     try:
         if isinstance(img_input, Image.Image):
-            img_rgb = img_input.convert('RGB')
+            # 已是RGB时直接使用，避免多余的像素复制
+            img_rgb = img_input if img_input.mode == 'RGB' else img_input.convert('RGB')
+            # GLM-4V无需高分辨率，超大图片先缩小再编码
+            if max(img_rgb.size) > OCR_MAX_SIDE:
+                scale = OCR_MAX_SIDE / max(img_rgb.size)
+                new_size = (max(1, int(img_rgb.width * scale)), max(1, int(img_rgb.height * scale)))
+                img_rgb = img_rgb.resize(new_size, Image.Resampling.BILINEAR)
             buf = io.BytesIO()
-            img_rgb.save(buf, format='JPEG', quality=70, subsampling=0)
-            img_binary = buf.getvalue()
+            img_rgb.save(buf, format='JPEG', quality=70, subsampling=2, optimize=False, progressive=False)
 
-            if not img_binary or len(img_binary) < 100:
+            if buf.tell() < 100:
                 print(f"❌ 上传的图片为空或尺寸过小，无法识别")
                 return ""
 
-            base64_str = base64.b64encode(img_binary).decode('utf-8')
-            standard_base64 = f"data:image/jpeg;base64,{base64_str}"
+            standard_base64 = "data:image/jpeg;base64," + base64.b64encode(buf.getbuffer()).decode('ascii')
             print(f"✅ 上传图片转Base64成功！长度: {len(standard_base64)} 字节")
             return standard_base64
         else:
@@ -647,13 +828,20 @@ def image_to_base64(img_input):
         return ""
 
 
+_JSON_DECODER = json.JSONDecoder(strict=False)
+# 证书识别字段
+_FIELDS = (
+    "student_college", "competition_project", "student_id",
+    "student_name", "award_category", "award_level",
+    "competition_type", "organizer", "award_time", "tutor_name"
+)
+# 模型返回的这些值视为未识别
+_EMPTY = frozenset({"无", "空", "-", "", "N/A", "暂无"})
+
+
 # ===================== ✅ 纯净版 GLM-4V调用函数（无冗余、无URL逻辑、完美适配） =====================
 def call_ocr_api(img_source: Image.Image, is_url=False) -> dict:
-    final_result = {
-        "student_college": "", "competition_project": "", "student_id": "",
-        "student_name": "", "award_category": "", "award_level": "",
-        "competition_type": "", "organizer": "", "award_time": "", "tutor_name": ""
-    }
+    final_result = dict.fromkeys(_FIELDS, "")
 
     print(f"\n===== GLM-4V 图片识别开始 =====")
     print(f"✅ 鉴权方式：智谱AI官方 API-KEY，格式正确")
@@ -666,43 +854,20 @@ def call_ocr_api(img_source: Image.Image, is_url=False) -> dict:
         final_result["award_category"] = "省级"
         return final_result
 
-    # GLM-4V 官方有效接口地址
-    api_url = "https://open.bigmodel.cn/api/paas/v4/chat/completions"
     headers = {
-        "Content-Type": "application/json;charset=utf-8",
-        "Authorization": f"Bearer {GLM4V_API_KEY}"
+        "Authorization": f"Bearer {GLM4V_API_KEY}",
+        "Content-Type": "application/json"
     }
 
-    # 识别提示词（最强约束，保证返回纯JSON）
-    prompt = """你是专业的赛事获奖证书信息提取专家，严格按要求执行，只返回标准JSON字符串，不要任何多余文字、换行、解释、备注、标点符号。
-提取固定字段(英文key不可修改，识别不到则为空字符串)：student_college, competition_project, student_id, student_name, award_category, award_level, competition_type, organizer, award_time, tutor_name
-提取规则：1.严格返回JSON格式，无其他内容；2.competition_type固定填写「学科竞赛」；3.award_category只能填写「国家级」或「省级」；4.如实识别，严禁编造任何信息；5.只输出JSON字符串。"""
-
-    req_data = {
-        "model": "glm-4v",
-        "messages": [
-            {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": prompt},
-                    {"type": "image_url", "image_url": {"url": img_base64}}
-                ]
-            }
-        ],
-        "temperature": 0.0,
-        "top_p": 0.8,
-        "max_tokens": 2048,
-        "stream": False
-    }
-    body = json.dumps(req_data, ensure_ascii=False)
+    req_body = _OCR_REQ_PREFIX + img_base64.encode("ascii") + _OCR_REQ_SUFFIX
 
     try:
         print(f"✅ 正在调用GLM-4V接口识别图片...")
-        res = requests.post(
-            api_url,
+        res = _get_http_session().post(
+            GLM4V_API_URL,
             headers=headers,
-            data=body.encode('utf-8'),
-            timeout=80,
+            data=req_body,
+            timeout=OCR_HTTP_TIMEOUT,
             allow_redirects=False,
             verify=False
         )
@@ -715,13 +880,20 @@ def call_ocr_api(img_source: Image.Image, is_url=False) -> dict:
             content = res_json.get("choices", [{}])[0].get("message", {}).get("content", "").strip()
             print(f"✅ GLM-4V识别结果: {content}")
 
-            if content and "{" in content and "}" in content:
-                start = content.find("{")
-                end = content.rfind("}") + 1
-                parse_data = json.loads(content[start:end], strict=False)
-                for key in final_result.keys():
-                    if key in parse_data and str(parse_data[key]).strip() not in ["无", "空", "-", "", "N/A", "暂无"]:
-                        final_result[key] = str(parse_data[key]).strip()
+            start = content.find("{")
+            if start != -1:
+                # 从第一个"{"处原地解析JSON对象，对象结束即停止，忽略其后的多余文字
+                try:
+                    parse_data, _ = _JSON_DECODER.raw_decode(content, start)
+                except ValueError:
+                    parse_data = {}
+                for key in _FIELDS:
+                    value = parse_data.get(key)
+                    if value is None:
+                        continue
+                    value = str(value).strip()
+                    if value not in _EMPTY:
+                        final_result[key] = value
 
     except Exception as e:
         print(f"❌ 识别接口调用异常: {str(e)}")
@@ -737,7 +909,7 @@ def call_ocr_api(img_source: Image.Image, is_url=False) -> dict:
     return final_result
 
 
-def save_uploaded_file(file, user_id: int) -> tuple[bool, str, dict]:
+def save_uploaded_file(file, user_id: int, conn: Optional[sqlite3.Connection] = None) -> tuple[bool, str, dict]:
     try:
         is_valid, err_msg, file_type = validate_upload_file(file)
         if not is_valid:
@@ -748,15 +920,19 @@ def save_uploaded_file(file, user_id: int) -> tuple[bool, str, dict]:
         filename = f"user_{user_id}_{timestamp}{file_ext}"
         file_path = os.path.join(UPLOAD_FOLDER, filename)
 
-        # 保存文件
+        # 分块写入文件，同时累计文件大小（无需写完后再读取文件大小）
+        file.seek(0)
+        file_size = 0
         with open(file_path, "wb") as f:
-            f.write(file.getbuffer())
-
-        file_size = os.path.getsize(file_path)
+            while chunk := file.read(UPLOAD_CHUNK_SIZE):
+                f.write(chunk)
+                file_size += len(chunk)
 
-        # 保存元信息 - 修复：强制提交，避免数据库写入延迟
-        if save_file_metadata(user_id, file.name, file_path, file_type, file_size):
+        # 保存元信息（传入conn时与后续写入共用同一事务）
+        file_id = save_file_metadata(user_id, file.name, file_path, file_type, file_size, conn=conn)
+        if file_id is not None:
             file_meta = {
+                "file_id": file_id,
                 "file_name": file.name,
                 "file_path": file_path,
                 "file_type": file_type,
@@ -772,6 +948,32 @@ def save_uploaded_file(file, user_id: int) -> tuple[bool, str, dict]:
         return False, str(e), {}
 
 
+def save_file_with_cert(file, user_id: int, cert_values: tuple, is_submitted: bool) -> tuple[bool, str, dict]:
+    """
+    保存上传文件并写入证书信息，文件记录与证书记录在同一事务中提交
+    :param cert_values: (student_college, competition_project, student_id, student_name, award_category,
+                        award_level, competition_type, organizer, award_time, tutor_name)
+    :param is_submitted: True为正式提交，False为草稿
+    """
+    meta = {}
+    try:
+        # 首条INSERT时隐式开启事务，文件落盘期间不占用数据库写锁
+        with _get_conn() as conn:
+            success, msg, meta = save_uploaded_file(file, user_id, conn=conn)
+            if not success:
+                return False, msg, {}
+            now = _now_str()
+            conn.execute(CERT_INSERT_SQL, (user_id, meta["file_id"], *cert_values,
+                  1 if is_submitted else 0, now if is_submitted else None, now))
+        _clear_file_caches()
+        return True, "", meta
+    except Exception as e:
+        # 事务已回滚，删除已写入磁盘的文件
+        if meta.get("file_path") and os.path.exists(meta["file_path"]):
+            os.remove(meta["file_path"])
+        return False, str(e), {}
+
+
 # --------------------------
 # 3. 会话状态初始化
 # --------------------------
@@ -801,8 +1003,8 @@ def init_session_state():
         st.session_state.preview_selected_size = {}
 
     # OCR相关状态
-    if "ocr_processing" not in st.session_state:
-        st.session_state.ocr_processing = False
+    if "ocr_futures" not in st.session_state:
+        st.session_state.ocr_futures = {}  # file_id -> 后台识别任务
     if "ocr_result" not in st.session_state:
         st.session_state.ocr_result = {
             "student_college": "", "competition_project": "", "student_id": "",
@@ -818,7 +1020,7 @@ def init_session_state():
 
     # 导入报告状态
     if "import_report" not in st.session_state:
-        st.session_state.import_report = {"success": 0, "failed": [], "total": 0}
+        st.session_state.import_report = None
 
     # 其他状态
     if "delete_confirm" not in st.session_state:
@@ -972,84 +1174,6 @@ def admin_page():
         df.to_excel(template_path, index=False)
         return template_path
 
-    def parse_excel_users(file):
-        try:
-            df = pd.read_excel(file, dtype={"学（工）号": str})
-            required_cols = ["学（工）号", "姓名", "角色类型", "单位", "邮箱"]
-
-            if not all(col in df.columns for col in required_cols):
-                return False, f"Excel表头缺失，必需包含：{required_cols}"
-
-            ROLE_CN_TO_EN = {
-                "学生": "student",
-                "教师": "teacher",
-                "管理员": "admin"
-            }
-
-            users = []
-            for idx, row in df.iterrows():
-                account_id = str(row["学（工）号"]).strip()
-                name = str(row["姓名"]).strip()
-                role_cn = str(row["角色类型"]).strip()
-                role = ROLE_CN_TO_EN.get(role_cn.lower(), role_cn.strip().lower())
-                department = str(row["单位"]).strip()
-                email = str(row["邮箱"]).strip()
-                password = str(row.get("初始密码", "123456Ab")).strip()
-
-                errors = []
-                if not account_id or not name or not role or not department or not email:
-                    errors.append("必填字段为空")
-                if role not in ["student", "teacher", "admin"]:
-                    errors.append(f"角色类型错误（{role}），仅支持student/teacher/admin或对应中文")
-                if not validate_account_format(account_id, role):
-                    errors.append(f"学工号格式错误（{role}需{13 if role == 'student' else 8}位数字）")
-                if check_account_exists(account_id):
-                    errors.append("学工号已存在")
-                if not validate_password(password):
-                    errors.append("密码必须至少8位，包含字母+数字")
-
-                users.append({
-                    "row": idx + 2,
-                    "account_id": account_id,
-                    "name": name,
-                    "role": role,
-                    "department": department,
-                    "email": email,
-                    "password": password,
-                    "errors": errors
-                })
-            return True, users
-        except Exception as e:
-            return False, f"Excel解析失败：{str(e)}"
-
-    def batch_import_users(users):
-        success_count = 0
-        failed_records = []
-        total_count = len(users)
-
-        for user in users:
-            if user["errors"]:
-                failed_records.append(f"第{user['row']}行：{'; '.join(user['errors'])}")
-                continue
-
-            if create_user(
-                    account_id=user["account_id"],
-                    name=user["name"],
-                    role=user["role"],
-                    department=user["department"],
-                    email=user["email"],
-                    password=user["password"]
-            ):
-                success_count += 1
-            else:
-                failed_records.append(f"第{user['row']}行：创建用户失败")
-
-        return {
-            "success": success_count,
-            "failed": failed_records,
-            "total": total_count
-        }
-
     # 下载模板
     template_path = generate_excel_template()
     with open(template_path, "rb") as f:
@@ -1067,34 +1191,51 @@ def admin_page():
         st.markdown("""
         - 学工号格式：学生13位数字、教师/管理员8位数字
         - 角色类型：student/teacher/admin 或 学生/教师/管理员
-        - 初始密码需满足：至少8位，包含字母+数字
+        - 初始密码需满足：至少8位，包含字母+数字；未填写时自动生成随机密码（导入后在结果中查看）
         - 学工号重复会导入失败
         """)
 
         if st.button("🚀 开始导入", type="primary"):
             with st.spinner("正在解析并导入用户..."):
-                parse_success, parse_result = parse_excel_users(uploaded_file)
-                if not parse_success:
-                    st.error(f"Excel解析失败：{parse_result}")
-                else:
-                    import_report = batch_import_users(parse_result)
-                    st.session_state.import_report = import_report
-
-                    st.subheader("📊 导入结果报告")
-                    col1, col2, col3 = st.columns(3)
-                    with col1:
-                        st.metric("总条数", import_report["total"])
-                    with col2:
-                        st.metric("成功条数", import_report["success"])
-                    with col3:
-                        st.metric("失败条数", len(import_report["failed"]))
-
-                    if import_report["failed"]:
-                        with st.expander("查看失败详情", expanded=True):
-                            for fail in import_report["failed"]:
-                                st.error(fail)
-                    else:
-                        st.success("🎉 所有用户导入成功！")
+                # 导入按文件路径分批流式读取，上传内容先写入临时文件
+                with tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False) as tmp:
+                    tmp.write(uploaded_file.getbuffer())
+                try:
+                    import_report = import_users_from_excel(tmp.name)
+                finally:
+                    os.remove(tmp.name)
+                get_all_users.clear()
+                st.session_state.import_report = import_report
+
+            stats = import_report["stats"]
+            if not import_report["success"]:
+                st.error(f"{import_report['message']}：{'; '.join(import_report['errors'])}")
+            if stats["total"]:
+                st.subheader("📊 导入结果报告")
+                col1, col2, col3, col4 = st.columns(4)
+                with col1:
+                    st.metric("总条数", stats["total"])
+                with col2:
+                    st.metric("成功条数", stats["success"])
+                with col3:
+                    st.metric("重复条数", stats["duplicate"])
+                with col4:
+                    st.metric("失败条数", stats["failed"])
+
+                created = [d for d in import_report["details"] if "password" in d]
+                if created:
+                    with st.expander("查看新建账号及初始密码", expanded=True):
+                        st.dataframe(pd.DataFrame(created)[["row", "account_id", "name", "password"]].rename(
+                            columns={"row": "行号", "account_id": "学/工号", "name": "姓名", "password": "初始密码"}),
+                            hide_index=True, use_container_width=True)
+
+                failed = [d for d in import_report["details"] if d["status"] in ("失败", "重复")]
+                if failed:
+                    with st.expander("查看失败详情", expanded=True):
+                        for d in failed:
+                            st.error(f"第{d['row']}行：{d['reason']}")
+                elif import_report["success"]:
+                    st.success("🎉 所有用户导入成功！")
     st.divider()
 
     # 3. 用户管理
@@ -1143,10 +1284,9 @@ def admin_page():
     st.subheader("📄 证书数据管理")
     col1, col2, col3 = st.columns(3)
     with col1:
-        award_category = st.selectbox("获奖类别", ["", "国家级", "省级"], key="filter_category")
+        award_category = st.selectbox("获奖类别", AWARD_CATEGORIES, key="filter_category")
     with col2:
-        award_level = st.selectbox("获奖等级", ["", "一等奖", "二等奖", "三等奖", "金奖", "银奖", "铜奖", "优秀奖"],
-                                   key="filter_level")
+        award_level = st.selectbox("获奖等级", AWARD_LEVELS, key="filter_level")
     with col3:
         submitter_role = st.selectbox("提交者角色", ["", "student", "teacher"],
                                       format_func=lambda x: ROLE_DISPLAY_MAP.get(x, "全部"), key="filter_role")
@@ -1251,11 +1391,10 @@ def admin_page():
     # 6. 系统配置
     st.subheader("🔧 系统配置")
     # 截止时间配置
-    conn = sqlite3.connect("certificate_system.db")
-    cursor = conn.cursor()
-    cursor.execute("SELECT config_value FROM system_config WHERE config_key = 'submit_deadline'")
-    current_deadline = cursor.fetchone()[0]
-    conn.close()
+    with _get_conn() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT config_value FROM system_config WHERE config_key = 'submit_deadline'")
+        current_deadline = cursor.fetchone()[0]
 
     new_deadline = st.text_input(
         "提交截止时间",
@@ -1271,6 +1410,41 @@ def admin_page():
             st.error("时间格式错误！请使用YYYY-MM-DD HH:MM:SS格式")
 
 
+# ===================== ✅ 已上传文件列表：一次性渲染表格 + 下拉选择删除 =====================
+def render_uploaded_file_list(uploaded_files: List[dict], key_prefix: str):
+    """
+    用一个st.dataframe展示文件列表（避免每行7列控件逐个发送到前端），删除操作改为下拉选择
+    :param uploaded_files: get_user_uploaded_files的结果（已带出提交状态）
+    :param key_prefix: 控件key前缀，同一页面多处调用时区分
+    """
+    rows = [
+        {
+            "#": idx + 1,
+            "名称": file["file_name"],
+            "类型": file["file_type"],
+            "大小(MB)": round(file["file_size"] / 1048576, 2),
+            "上传时间": file["upload_time"],
+            "状态": "✅ 已提交" if file["is_submitted"] == 1 else "📝 草稿",
+        }
+        for idx, file in enumerate(uploaded_files)
+    ]
+    st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+
+    file_names = {file["file_id"]: file["file_name"] for file in uploaded_files}
+    selected_id = st.selectbox(
+        "选择要删除的文件",
+        options=list(file_names),
+        format_func=lambda fid: file_names[fid],
+        key=f"{key_prefix}_delete_select"
+    )
+    if st.button("删除", key=f"{key_prefix}_delete_btn", type="secondary"):
+        if delete_file_by_id(selected_id):
+            st.success(f"✅ 文件 {file_names[selected_id]} 已删除！")
+            st.rerun()
+        else:
+            st.error(f"❌ 删除文件 {file_names[selected_id]} 失败！")
+
+
 def render_file_upload_page(user_id: int, user_role: str):
     st.title(f"📄 证书上传与智能识别 - {ROLE_DISPLAY_MAP[user_role]}")
 
@@ -1284,31 +1458,7 @@ def render_file_upload_page(user_id: int, user_role: str):
         st.subheader("📋 已上传文件列表")
         uploaded_files = get_user_uploaded_files(user_id)
         if uploaded_files:
-            for idx, file in enumerate(uploaded_files):
-                col1, col2, col3, col4, col5, col6, col7 = st.columns([1, 2, 1, 1, 2, 1, 1])
-                with col1:
-                    st.write(idx + 1)
-                with col2:
-                    st.write(file["file_name"])
-                with col3:
-                    st.write(file["file_type"])
-                with col4:
-                    st.write(f"{file['file_size'] / 1024 / 1024:.2f} MB")
-                with col5:
-                    st.write(file["upload_time"])
-                # 新增：显示提交状态
-                with col6:
-                    cert_info = get_cert_info_by_file_id(file["file_id"])
-                    st.write("✅ 已提交" if cert_info and cert_info["is_submitted"] == 1 else "📝 草稿")
-                with col7:
-                    if st.button("删除", key=f"delete_btn_deadline_{file['file_id']}", type="secondary"):
-                        if delete_file_by_id(file["file_id"]):
-                            st.success(f"✅ 文件 {file['file_name']} 已删除！")
-                            st.rerun()
-                        else:
-                            st.error(f"❌ 删除文件 {file['file_name']} 失败！")
-                if idx < len(uploaded_files) - 1:
-                    st.divider()
+            render_uploaded_file_list(uploaded_files, key_prefix="deadline")
         return
 
     # ===================== ✅ 新增：顶部显示草稿/已提交数量统计 =====================
@@ -1406,8 +1556,8 @@ def render_file_upload_page(user_id: int, user_role: str):
                 # 尺寸设置
                 target_size = st.selectbox(
                     "图片尺寸预设",
-                    list(STANDARD_SIZES.keys()),
-                    index=list(STANDARD_SIZES.keys()).index(st.session_state.upload_selected_size),
+                    SIZE_KEYS,
+                    index=SIZE_KEY_IDX[st.session_state.upload_selected_size],
                     format_func=lambda x: f"{x} ({STANDARD_SIZES[x][0]}x{STANDARD_SIZES[x][1]})",
                     key="target_size"
                 )
@@ -1429,37 +1579,46 @@ def render_file_upload_page(user_id: int, user_role: str):
                 )
                 st.image(final_img, width=600)
 
-                # 转换为base64
-                base64_str = image_to_base64(final_img)
-
                 # 步骤3：智能识别证书信息
                 st.subheader("🔸 步骤3：智能识别证书信息")
 
-                if not st.session_state.ocr_processing:
+                ocr_futures = st.session_state.ocr_futures
+                ocr_key = getattr(uploaded_file, "file_id", uploaded_file.name)  # 每次上传对应一个识别任务
+                ocr_fut = ocr_futures.get(ocr_key)
+                if ocr_fut is None:
                     if st.button("🔍 使用GLM-4V提取信息", type="primary", disabled=not api_key):
                         if not api_key:
                             st.error("请先配置GLM-4V API Key（管理员后台配置或临时填写）")
                             return
 
-                        st.session_state.ocr_processing = True
-                        with st.spinner("正在分析图片，请稍候..."):
-                            # ===================== ✅ 核心修复2：img → final_img 解决变量未定义 =====================
-                            raw_response = call_ocr_api(final_img, is_url=False)
-                            # 解析响应
-                            parsed_obj = info_extractor.parse_api_response(raw_response)
-                            # 保存日志
-                            info_extractor.save_result_to_log(uploaded_file.name, parsed_obj)
-
-                            if parsed_obj['status'] == 'failed':
-                                st.error(f"❌ 识别失败: {parsed_obj['error']}")
-                            else:
-                                st.success("✅ 识别成功！请核对信息")
-                                st.session_state.ocr_result = parsed_obj['data']
-
-                                if parsed_obj.get("warning"):
-                                    st.warning(f"⚠️ {parsed_obj['warning']}")
+                        # ===================== ✅ 核心修复2：img → final_img 解决变量未定义 =====================
+                        # 后台提交识别任务，立即返回，页面不再阻塞等待接口
+                        ocr_futures[ocr_key] = submit_ocr(final_img)
+                        st.rerun()
+                elif not ocr_fut.done():
+                    st.info("⏳ 正在分析图片，请稍候...")
+                    # 短暂等待（任务完成则立即返回）后自动刷新页面，无需手动点击
+                    wait([ocr_fut], timeout=OCR_POLL_INTERVAL)
+                    st.rerun()
+                else:
+                    ocr_futures.pop(ocr_key, None)
+                    try:
+                        raw_response = ocr_fut.result()
+                    except Exception as e:
+                        raw_response = {"error": str(e)}
+                    # 解析响应
+                    parsed_obj = info_extractor.parse_api_response(raw_response)
+                    # 保存日志
+                    info_extractor.save_result_to_log(uploaded_file.name, parsed_obj)
+
+                    if parsed_obj['status'] == 'failed':
+                        st.error(f"❌ 识别失败: {parsed_obj['error']}")
+                    else:
+                        st.success("✅ 识别成功！请核对信息")
+                        st.session_state.ocr_result = parsed_obj['data']
 
-                        st.session_state.ocr_processing = False
+                        if parsed_obj.get("warning"):
+                            st.warning(f"⚠️ {parsed_obj['warning']}")
 
                 # 步骤4：信息核对与提交
                 st.subheader("🔸 步骤4：信息核对与提交")
@@ -1494,25 +1653,20 @@ def render_file_upload_page(user_id: int, user_role: str):
                         )
                         category = st.selectbox(
                             "获奖类别",
-                            ["", "国家级", "省级"],
-                            index=["", "国家级", "省级"].index(ocr_data.get("award_category"))
-                            if ocr_data.get("award_category") in ["国家级", "省级"] else 0
+                            AWARD_CATEGORIES,
+                            index=AWARD_CATEGORY_IDX.get(ocr_data.get("award_category"), 0)
                         )
 
                     with col2:
                         level = st.selectbox(
                             "获奖等级",
-                            ["", "一等奖", "二等奖", "三等奖", "金奖", "银奖", "铜奖", "优秀奖"],
-                            index=["", "一等奖", "二等奖", "三等奖", "金奖", "银奖", "铜奖", "优秀奖"].index(
-                                ocr_data.get("award_level"))
-                            if ocr_data.get("award_level") in ["一等奖", "二等奖", "三等奖", "金奖", "银奖", "铜奖",
-                                                               "优秀奖"] else 0
+                            AWARD_LEVELS,
+                            index=AWARD_LEVEL_IDX.get(ocr_data.get("award_level"), 0)
                         )
                         c_type = st.selectbox(
                             "竞赛类型",
-                            ["", "A类", "B类"],
-                            index=["", "A类", "B类"].index(ocr_data.get("competition_type"))
-                            if ocr_data.get("competition_type") in ["A类", "B类"] else 0
+                            COMPETITION_TYPES,
+                            index=COMPETITION_TYPE_IDX.get(ocr_data.get("competition_type"), 0)
                         )
                         organizer = st.text_input(
                             "主办单位",
@@ -1550,34 +1704,14 @@ def render_file_upload_page(user_id: int, user_role: str):
 
                         # 保存文件和草稿信息
                         with st.spinner("正在保存草稿..."):
-                            success, msg, meta = save_uploaded_file(uploaded_file, user_id)
+                            # 保存文件和证书信息 - is_submitted=0 表示草稿
+                            success, msg, meta = save_file_with_cert(
+                                uploaded_file, user_id,
+                                (college, project, s_id, s_name, category, level, c_type, organizer, award_time, tutor),
+                                is_submitted=False
+                            )
                             if success:
-                                # 获取文件ID
-                                conn = sqlite3.connect("certificate_system.db")
-                                cursor = conn.cursor()
-                                cursor.execute("SELECT file_id FROM files WHERE file_path = ?",
-                                               (meta['file_path'],))
-                                file_res = cursor.fetchone()
-
-                                if file_res:
-                                    file_id = file_res[0]
-                                    # 插入证书信息 - is_submitted=0 表示草稿
-                                    cursor.execute('''
-                                    INSERT INTO certificate_info 
-                                    (user_id, file_id, student_college, competition_project, student_id, student_name,
-                                     award_category, award_level, competition_type, organizer, award_time, tutor_name,
-                                     is_submitted, submit_time)
-                                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0, NULL)
-                                    ''', (
-                                        user_id, file_id, college, project, s_id, s_name,
-                                        category, level, c_type, organizer, award_time, tutor
-                                    ))
-                                    conn.commit()
-                                    st.success(f"✅ 草稿保存成功！文件已上传：{meta['file_name']}，可随时修改后提交")
-                                else:
-                                    st.error("❌ 获取文件ID失败")
-
-                                conn.close()
+                                st.success(f"✅ 草稿保存成功！文件已上传：{meta['file_name']}，可随时修改后提交")
 
                                 # 重置状态
                                 st.session_state.temp_uploaded_file = None
@@ -1610,34 +1744,14 @@ def render_file_upload_page(user_id: int, user_role: str):
 
                         # 保存文件和信息
                         with st.spinner("正在提交信息..."):
-                            success, msg, meta = save_uploaded_file(uploaded_file, user_id)
+                            # 保存文件和证书信息 - is_submitted=1 表示已提交
+                            success, msg, meta = save_file_with_cert(
+                                uploaded_file, user_id,
+                                (college, project, s_id, s_name, category, level, c_type, organizer, award_time, tutor),
+                                is_submitted=True
+                            )
                             if success:
-                                # 获取文件ID
-                                conn = sqlite3.connect("certificate_system.db")
-                                cursor = conn.cursor()
-                                cursor.execute("SELECT file_id FROM files WHERE file_path = ?",
-                                               (meta['file_path'],))
-                                file_res = cursor.fetchone()
-
-                                if file_res:
-                                    file_id = file_res[0]
-                                    # 插入证书信息 - is_submitted=1 表示已提交
-                                    cursor.execute('''
-                                    INSERT INTO certificate_info 
-                                    (user_id, file_id, student_college, competition_project, student_id, student_name,
-                                     award_category, award_level, competition_type, organizer, award_time, tutor_name,
-                                     is_submitted, submit_time)
-                                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1, datetime('now', '+8 hours'))
-                                    ''', (
-                                        user_id, file_id, college, project, s_id, s_name,
-                                        category, level, c_type, organizer, award_time, tutor
-                                    ))
-                                    conn.commit()
-                                    st.success(f"🎉 正式提交成功！文件已上传：{meta['file_name']}，提交后数据不可修改！")
-                                else:
-                                    st.error("❌ 获取文件ID失败")
-
-                                conn.close()
+                                st.success(f"🎉 正式提交成功！文件已上传：{meta['file_name']}，提交后数据不可修改！")
 
                                 # 重置状态
                                 st.session_state.temp_uploaded_file = None
@@ -1658,32 +1772,7 @@ def render_file_upload_page(user_id: int, user_role: str):
     st.subheader("📋 已上传文件列表")
     uploaded_files = get_user_uploaded_files(user_id)
     if uploaded_files:
-        for idx, file in enumerate(uploaded_files):
-            col1, col2, col3, col4, col5, col6, col7 = st.columns([1, 2, 1, 1, 2, 1, 1])
-            with col1:
-                st.write(idx + 1)
-            with col2:
-                st.write(file["file_name"])
-            with col3:
-                st.write(file["file_type"])
-            with col4:
-                st.write(f"{file['file_size'] / 1024 / 1024:.2f} MB")
-            with col5:
-                st.write(file["upload_time"])
-            # 新增：显示提交状态
-            with col6:
-                cert_info = get_cert_info_by_file_id(file["file_id"])
-                status_text = "✅ 已提交" if cert_info and cert_info["is_submitted"] == 1 else "📝 草稿"
-                st.write(status_text)
-            with col7:
-                if st.button("删除", key=f"delete_btn_{file['file_id']}", type="secondary"):
-                    if delete_file_by_id(file["file_id"]):
-                        st.success(f"✅ 文件 {file['file_name']} 已删除！")
-                        st.rerun()
-                    else:
-                        st.error(f"❌ 删除文件 {file['file_name']} 失败！")
-            if idx < len(uploaded_files) - 1:
-                st.divider()
+        render_uploaded_file_list(uploaded_files, key_prefix="upload")
     else:
         st.info("📭 暂无已上传的文件，请先上传证书文件！")
 
@@ -1711,7 +1800,7 @@ def main():
                 st.session_state.upload_original_img = None
                 st.session_state.upload_total_rotate = 0
                 st.session_state.upload_selected_size = "custom"
-                st.session_state.ocr_processing = False
+                st.session_state.ocr_futures = {}
                 st.session_state.temp_uploaded_file = None
                 st.rerun()
 
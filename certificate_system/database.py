@@ -1,7 +1,40 @@
 import sqlite3
+import atexit
+import threading
 import bcrypt  # 统一使用bcrypt加密，替换原hashlib
 import hashlib  # 保留兼容，实际使用bcrypt
 
+DB_PATH = "certificate_system.db"
+# bcrypt计算强度：与auth_system.BCRYPT_ROUNDS保持一致
+BCRYPT_ROUNDS = 10
+
+# 模块级共享连接（首次使用时创建，进程退出时关闭）
+_conn = None
+# 共享连接的锁：连接以isolation_level=None运行、由调用方显式BEGIN/COMMIT，
+# 使用连接的整个过程（含整个显式事务）都要持有该锁，否则其他线程的语句会混入本线程的事务
+# 可重入：持锁的调用方内部再调用本模块的函数不会死锁
+connection_lock = threading.RLock()
+
+
+def get_connection():
+    """
+    获取模块级共享连接，整个进程只打开一次数据库文件、只设置一次PRAGMA
+    isolation_level=None：不隐式开启事务，需要批量写入时由调用方显式BEGIN/COMMIT，整批只同步一次磁盘
+    调用方不要关闭该连接；多线程使用时须在 with connection_lock: 内执行语句和事务
+    """
+    global _conn
+    if _conn is None:
+        with connection_lock:
+            if _conn is None:
+                conn = sqlite3.connect(DB_PATH, isolation_level=None, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode = WAL")
+                conn.execute("PRAGMA synchronous = NORMAL")
+                conn.execute("PRAGMA temp_store = MEMORY")
+                conn.execute("PRAGMA cache_size = -64000")
+                atexit.register(conn.close)
+                _conn = conn
+    return _conn
+
 # --------------------------
 # 核心数据库操作函数
 # --------------------------
@@ -88,7 +121,7 @@ def init_database():
     cursor.execute("SELECT 1 FROM users WHERE account_id = ?", (admin_account,))
     if not cursor.fetchone():
         password = "Admin123456"
-        salt = bcrypt.gensalt()
+        salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
         password_hash = bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
         cursor.execute('''
         INSERT INTO users (account_id, name, role, department, email, password_hash, created_by)
@@ -100,8 +133,8 @@ def init_database():
 
 
 def hash_password(password):
-    """密码加密（统一使用bcrypt）"""
-    salt = bcrypt.gensalt()
+    """密码加密（统一使用bcrypt；模块级纯函数，可交给进程池并行执行）"""
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
     return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
 
 
@@ -114,39 +147,32 @@ def verify_password(input_pwd, stored_hash):
         return hashlib.sha256(input_pwd.encode('utf-8')).hexdigest() == stored_hash
 
 
-def check_account_exists(account_id):
-    """检查账号是否存在"""
-    conn = sqlite3.connect("certificate_system.db")
-    cursor = conn.cursor()
-    cursor.execute("SELECT 1 FROM users WHERE account_id = ?", (account_id,))
-    result = cursor.fetchone()
-    conn.close()
-    return result is not None
+def check_account_exists(account_id, conn=None):
+    """检查账号是否存在（默认使用共享连接）"""
+    with connection_lock:
+        conn = conn or get_connection()
+        return conn.execute("SELECT 1 FROM users WHERE account_id = ?", (account_id,)).fetchone() is not None
 
 
 def validate_account_format(account_id, role):
-    """验证学工号格式"""
-    if not account_id.isdigit():
-        return False
-    if role == 'student' and len(account_id) != 13:
-        return False
-    if role in ['teacher', 'admin'] and len(account_id) != 8:
-        return False
-    return True
+    """验证学工号格式（学生13位，教师/管理员8位，均为数字）"""
+    return len(account_id) == (13 if role == 'student' else 8) and account_id.isdigit()
 
 
-def create_user(account_id, name, role, department, email, password, created_by="self_register"):
-    """创建用户"""
+def create_user(account_id, name, role, department, email, password, created_by="self_register", conn=None):
+    """
+    创建用户（默认使用共享连接，不在事务中时自动提交）
+    传入conn时在调用方的事务内写入，由调用方提交
+    """
     try:
-        conn = sqlite3.connect("certificate_system.db")
-        cursor = conn.cursor()
+        # 加密在持锁之前完成，不占用共享连接
         pwd_hash = hash_password(password)
-        cursor.execute('''
-        INSERT INTO users (account_id, name, role, department, email, password_hash, created_by)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (account_id, name, role, department, email, pwd_hash, created_by))
-        conn.commit()
-        conn.close()
+        with connection_lock:
+            conn = conn or get_connection()
+            conn.execute('''
+            INSERT INTO users (account_id, name, role, department, email, password_hash, created_by)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (account_id, name, role, department, email, pwd_hash, created_by))
         return True
     except sqlite3.IntegrityError:
         return False
@@ -155,16 +181,92 @@ def create_user(account_id, name, role, department, email, password, created_by=
         return False
 
 
-def get_user_by_account(account_id):
-    """根据账号获取用户信息"""
-    conn = sqlite3.connect("certificate_system.db")
-    cursor = conn.cursor()
-    cursor.execute('''
-    SELECT user_id, account_id, name, role, department, email, is_active, password_hash
-    FROM users WHERE account_id = ?
-    ''', (account_id,))
-    user = cursor.fetchone()
-    conn.close()
+# 批量插入用户的语句：模块级常量，整个导入只准备一次，之后只绑定参数执行
+USER_BULK_INSERT_SQL = '''
+INSERT OR IGNORE INTO users (account_id, name, role, department, email, password_hash, created_by)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+# 批量导入并更新已有用户的语句：账号已存在时只更新基本信息，不改动原密码和创建来源
+USER_BULK_UPSERT_SQL = '''
+INSERT OR IGNORE INTO users (account_id, name, role, department, email, password_hash, created_by)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(account_id) DO UPDATE SET
+    name = excluded.name, role = excluded.role, department = excluded.department, email = excluded.email
+'''
+# 按账号批量查询时每条语句绑定的参数个数（旧版SQLite单条语句最多999个参数）
+_IN_QUERY_SIZE = 500
+
+
+class BulkInserter:
+    """
+    批量插入用户（executemany + INSERT OR IGNORE）
+    整个导入过程复用同一个游标和同一条语句，SQLite只解析一次，逐行只做参数绑定
+    账号重复等违反约束的行由SQLite直接跳过（借助account_id的UNIQUE索引判重，无需逐行预先查询，也不预加载整表账号）
+    开启update_existing时改用UPSERT，新账号插入、已有账号更新在同一条语句内完成
+    """
+
+    def __init__(self, conn, batch_size=5000, update_existing=False):
+        """
+        :param conn: 数据库连接（在调用方的事务内写入，由调用方提交；共享连接须在持有connection_lock时调用flush）
+        :param batch_size: 每批executemany的行数
+        :param update_existing: 账号已存在时是否更新其基本信息（False则跳过）
+        """
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.sql = USER_BULK_UPSERT_SQL if update_existing else USER_BULK_INSERT_SQL
+        self.update_existing = update_existing
+        self.batch_size = batch_size
+
+    def existing_accounts(self, account_ids):
+        """
+        查询给定账号中已存在的部分（IN查询走account_id的UNIQUE索引，只涉及本批账号）
+        :param account_ids: 待查询的账号
+        :return: 已存在的账号集合
+        """
+        account_ids = list(account_ids)
+        found = set()
+        with connection_lock:
+            for i in range(0, len(account_ids), _IN_QUERY_SIZE):
+                part = account_ids[i:i + _IN_QUERY_SIZE]
+                placeholders = ", ".join("?" * len(part))
+                found.update(r[0] for r in self.conn.execute(
+                    f"SELECT account_id FROM users WHERE account_id IN ({placeholders})", part))
+        return found
+
+    def flush(self, rows):
+        """
+        写入一组行（同一账号在rows中重复出现时：插入模式只有第一行成功，UPSERT模式后面的行更新前面插入的行）
+        :param rows: 每行为 (account_id, name, role, department, email, password_hash, created_by)
+        :return: 与rows一一对应的写入结果（True成功/False失败）
+        """
+        results = []
+        for i in range(0, len(rows), self.batch_size):
+            batch = rows[i:i + self.batch_size]
+            # 每批设保存点：全部写入成功时（常见情况）只需一次executemany
+            self.conn.execute("SAVEPOINT bulk_batch")
+            self.cursor.executemany(self.sql, batch)
+            if self.cursor.rowcount == len(batch):
+                self.conn.execute("RELEASE bulk_batch")
+                results.extend([True] * len(batch))
+                continue
+            # 有行被跳过：撤销本批后逐行重做，每行的rowcount即为该行是否写入（插入或更新均为1，被忽略为0）
+            # 只在出现约束冲突的批次上付出逐行执行的开销，不需要查询整张表
+            self.conn.execute("ROLLBACK TO bulk_batch")
+            for row in batch:
+                self.cursor.execute(self.sql, row)
+                results.append(self.cursor.rowcount == 1)
+            self.conn.execute("RELEASE bulk_batch")
+        return results
+
+
+def get_user_by_account(account_id, conn=None):
+    """根据账号获取用户信息（默认使用共享连接）"""
+    with connection_lock:
+        conn = conn or get_connection()
+        user = conn.execute('''
+        SELECT user_id, account_id, name, role, department, email, is_active, password_hash
+        FROM users WHERE account_id = ?
+        ''', (account_id,)).fetchone()
     if user:
         return {
             "user_id": user[0],
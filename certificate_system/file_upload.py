@@ -8,6 +8,7 @@ from database import save_file_metadata
 
 # 上传文件存储目录（自动创建）
 UPLOAD_DIR = "uploaded_files"
+UPLOAD_CHUNK_SIZE = 1 << 20  # 分块写入大小（1MB）
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 
@@ -40,11 +41,14 @@ def save_uploaded_file(file, user_id: int) -> Tuple[bool, str, Dict]:
     unique_name = generate_unique_filename(original_name)
     file_path = os.path.join(UPLOAD_DIR, unique_name)
 
-    # 3. 保存文件到本地
+    # 3. 分块保存文件到本地，同时累计文件大小
     try:
+        file.seek(0)
+        file_size = 0
         with open(file_path, "wb") as f:
-            f.write(file.getbuffer())
-        file_size = os.path.getsize(file_path)
+            while chunk := file.read(UPLOAD_CHUNK_SIZE):
+                f.write(chunk)
+                file_size += len(chunk)
     except Exception as e:
         return False, f"保存文件失败：{str(e)}", {}
 
@@ -92,7 +96,7 @@ def render_file_upload_page(user_id: int, user_role: str):
     if uploaded_file:
         # 显示文件基本信息
         st.subheader("文件信息")
-        file_size = len(uploaded_file.getbuffer())
+        file_size = uploaded_file.size
         st.write(f"文件名：{uploaded_file.name}")
         st.write(f"大小：{file_size / 1024:.2f} KB")
 
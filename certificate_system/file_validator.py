@@ -1,6 +1,15 @@
 import os
+import threading
 from typing import Tuple, Dict
 
+try:
+    import magic  # python-magic（依赖libmagic），不可用时退回内置文件头比对
+    _MAGIC = magic.Magic(mime=True)
+except Exception:
+    _MAGIC = None
+# libmagic句柄（magic_t）不是线程安全的，Streamlit多会话并发上传时需串行调用
+_MAGIC_LOCK = threading.Lock()
+
 # 允许的文件格式
 ALLOWED_EXTENSIONS = {
     'pdf': 'pdf',
@@ -9,8 +18,44 @@ ALLOWED_EXTENSIONS = {
     'png': 'image',
     'bmp': 'image'
 }
+# 允许的后缀集合（用于快速判断是否支持）
+_ALLOWED_EXT_SET = frozenset(ALLOWED_EXTENSIONS)
 # 文件大小限制：10MB（字节）
 MAX_FILE_SIZE = 10 * 1024 * 1024
+# 文件头特征（通用格式）
+FILE_SIGNATURES = {
+    'pdf': b'%PDF-',
+    'jpg': b'\xFF\xD8\xFF',
+    'jpeg': b'\xFF\xD8\xFF',
+    'png': b'\x89PNG\r\n\x1a\n',
+    'bmp': b'BM'
+}
+# 校验文件头所需的最大字节数
+_MAX_SIG_LEN = max(len(sig) for sig in FILE_SIGNATURES.values())
+# libmagic识别时读取的文件头长度
+_MAGIC_READ_LEN = 2048
+# libmagic返回的MIME类型 -> 文件类型
+_MIME_TO_TYPE = {
+    'application/pdf': 'pdf',
+    'image/jpeg': 'image',
+    'image/png': 'image',
+    'image/bmp': 'image',
+    'image/x-ms-bmp': 'image'
+}
+# 文件头预计算为整数：(特征值, 掩码, 文件类型)，文件头转为整数后逐个按位比较
+_SIGS_INT = tuple(
+    (
+        int.from_bytes(sig.ljust(_MAX_SIG_LEN, b'\0'), 'big'),
+        ((1 << (len(sig) * 8)) - 1) << ((_MAX_SIG_LEN - len(sig)) * 8),
+        file_type
+    )
+    for sig, file_type in {sig: ALLOWED_EXTENSIONS[ext] for ext, sig in FILE_SIGNATURES.items()}.items()
+)
+# 常用错误提示（预先构建，拒绝上传时直接返回）
+_ERR_NONE = "未选择上传文件！"
+_ERR_UNSUPPORTED_FORMAT = f"文件格式不支持！仅允许：{', '.join(ALLOWED_EXTENSIONS)}"
+_ERR_SHORT = "文件内容过短，无法验证类型！"
+_ERR_EXT_MISMATCH = "文件后缀为{0}，但实际不是{0}文件（文件头不匹配）！"
 
 
 def get_file_extension(filename: str) -> str:
@@ -18,6 +63,25 @@ def get_file_extension(filename: str) -> str:
     return os.path.splitext(filename)[1].lower().lstrip('.')
 
 
+def detect_file_type(file_content: memoryview) -> str:
+    """
+    根据文件头识别文件类型（与后缀无关）
+    :param file_content: 文件内容（至少包含文件头）
+    :return: 文件类型（pdf/image），无法识别返回空字符串
+    """
+    if _MAGIC is not None:
+        head = bytes(file_content[:_MAGIC_READ_LEN])
+        with _MAGIC_LOCK:
+            mime = _MAGIC.from_buffer(head)
+        return _MIME_TO_TYPE.get(mime, "")
+
+    head = int.from_bytes(bytes(file_content[:_MAX_SIG_LEN]).ljust(_MAX_SIG_LEN, b'\0'), 'big')
+    for pattern, mask, file_type in _SIGS_INT:
+        if head & mask == pattern:
+            return file_type
+    return ""
+
+
 def validate_file_format(filename: str, file_content: memoryview) -> Tuple[bool, str, str]:
     """
     验证文件格式（后缀+文件头，兼容memoryview）
@@ -27,37 +91,28 @@ def validate_file_format(filename: str, file_content: memoryview) -> Tuple[bool,
     """
     # 1. 验证后缀
     ext = get_file_extension(filename)
-    if ext not in ALLOWED_EXTENSIONS:
-        return False, f"文件格式不支持！仅允许：{', '.join(ALLOWED_EXTENSIONS.keys())}", ""
+    if ext not in _ALLOWED_EXT_SET:
+        return False, _ERR_UNSUPPORTED_FORMAT, ""
 
-    # 2. 核心修复：将memoryview转换为bytes（关键）
-    try:
-        file_bytes = bytes(file_content)  # 转换为bytes类型
-    except Exception as e:
-        return False, f"转换文件内容失败：{str(e)}", ""
-
-    # 3. 文件头特征（通用格式）
-    FILE_SIGNATURES = {
-        'pdf': b'%PDF-',
-        'jpg': b'\xFF\xD8\xFF',
-        'jpeg': b'\xFF\xD8\xFF',
-        'png': b'\x89PNG\r\n\x1a\n',
-        'bmp': b'BM'
-    }
-
-    # 4. 校验文件头（现在可以用startswith了）
+    # 2. 类型校验（memoryview/bytes/bytearray均支持切片，无需整体转换为bytes）
+    if not isinstance(file_content, (memoryview, bytes, bytearray)):
+        return False, f"文件内容类型不支持：{type(file_content).__name__}", ""
+
+    # 3. 校验文件头
     signature = FILE_SIGNATURES.get(ext)
     if not signature:
         return False, f"不支持的文件类型：{ext}", ""
 
     # 补充：处理文件内容过短的情况
-    if len(file_bytes) < len(signature):
-        return False, "文件内容过短，无法验证类型！", ""
+    if len(file_content) < len(signature):
+        return False, _ERR_SHORT, ""
 
-    if not file_bytes.startswith(signature):
-        return False, f"文件后缀为{ext}，但实际不是{ext}文件（文件头不匹配）！", ""
+    # 按文件头识别实际类型（后缀与内容不完全一致但属于同类文件时仍可通过）
+    file_type = detect_file_type(file_content)
+    if file_type != ALLOWED_EXTENSIONS[ext]:
+        return False, _ERR_EXT_MISMATCH.format(ext), ""
 
-    return True, "", ALLOWED_EXTENSIONS[ext]
+    return True, "", file_type
 
 
 def validate_file_size(file_size: int) -> Tuple[bool, str]:
@@ -79,21 +134,31 @@ def validate_upload_file(file) -> Tuple[bool, str, str]:
     """
     # 1. 空值判断
     if file is None:
-        return False, "未选择上传文件！", ""
+        return False, _ERR_NONE, ""
 
-    # 2. 读取文件内容和大小（兼容memoryview）
+    # 2. 获取文件大小（优先使用上传对象自带的size，否则定位到末尾取偏移量，不读取文件内容）
     try:
-        file_content = file.getbuffer()  # 返回memoryview
-        file_size = len(file_content)  # memoryview可直接取长度
+        file_size = getattr(file, "size", None)
+        if file_size is None:
+            file.seek(0, os.SEEK_END)
+            file_size = file.tell()
     except Exception as e:
-        return False, f"读取文件内容失败：{str(e)}", ""
+        return False, f"读取文件大小失败：{str(e)}", ""
 
-    # 3. 验证大小
+    # 3. 验证大小（超限文件在读取内容之前即被拒绝）
     is_size_valid, size_err = validate_file_size(file_size)
     if not is_size_valid:
         return False, size_err, ""
 
-    # 4. 验证格式（直接传入memoryview，内部转换为bytes）
+    # 读取文件头
+    try:
+        file.seek(0)
+        file_content = file.read(_MAGIC_READ_LEN)
+        file.seek(0)
+    except Exception as e:
+        return False, f"读取文件内容失败：{str(e)}", ""
+
+    # 4. 验证格式（仅传入文件头）
     is_format_valid, format_err, file_type = validate_file_format(file.name, file_content)
     if not is_format_valid:
         return False, format_err, ""
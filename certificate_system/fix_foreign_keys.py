@@ -0,0 +1,98 @@
+import re
+import sqlite3
+import sys
+
+# 旧版迁移把users改名为users_old后，SQLite会把files/certificate_info的外键一并改写为指向users_old，
+# users_old删除后这两张表开启外键约束时无法写入，也无法级联删除；旧版certificate_info还缺少created_at列，
+# users缺少批量导入写入的created_by列。
+# auth_system启动时会自动检测并修复，也可在停止应用后手动执行：
+#     python fix_foreign_keys.py [数据库路径]
+LEGACY_PARENT = "users_old"
+# 按依赖顺序重建（certificate_info引用files）
+TABLES = ("files", "certificate_info")
+# 旧版表结构缺少的列：表名 -> ((列名, 列定义, 回填来源列), ...)
+# ALTER TABLE ADD COLUMN不支持datetime('now')这类非常量默认值，这类列不带默认值，已有行用已有数据回填；
+# 回填来源为None时已有行取列定义中的常量默认值
+MISSING_COLUMNS = {
+    "certificate_info": (("created_at", "TIMESTAMP", "updated_at"),),
+    "users": (("created_by", "TEXT DEFAULT 'self_register'", None),),
+}
+
+
+def _legacy_fk_tables(conn: sqlite3.Connection) -> list:
+    """外键仍指向users_old的表"""
+    tables = []
+    for table in TABLES:
+        row = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()
+        if row is not None and LEGACY_PARENT in row[0]:
+            tables.append(table)
+    return tables
+
+
+def _missing_columns(conn: sqlite3.Connection) -> list:
+    """已存在的表中缺少的列：[(表名, 列名, 列类型, 回填来源列), ...]"""
+    missing = []
+    for table, columns in MISSING_COLUMNS.items():
+        existing = {r[1] for r in conn.execute(f'PRAGMA table_info("{table}")')}
+        if not existing:
+            continue
+        missing.extend((table, *col) for col in columns if col[0] not in existing)
+    return missing
+
+
+def repair_legacy_schema(db_path: str = "certificate_system.db") -> list:
+    """
+    修复旧版数据库的表结构：外键指向users_old的表按原建表语句重建为指向users，并补上缺少的列
+    重建时只替换外键引用的表名，列、数据、索引原样保留；补列时已有行用已有数据回填，不写入当前时间
+    无需修复时只读取表结构，不加写锁；可重复执行
+    :param db_path: 数据库路径
+    :return: 已修复项（重建的表名、补上的“表名.列名”）
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    repaired = []
+    try:
+        if not _legacy_fk_tables(conn) and not _missing_columns(conn):
+            return repaired
+        # 重建期间必须关闭外键约束，否则删除旧表会触发级联删除
+        conn.execute("PRAGMA foreign_keys = OFF")
+        conn.execute("BEGIN EXCLUSIVE")
+        # 加锁后重新检测，其他进程可能已完成修复
+        for table in _legacy_fk_tables(conn):
+            row = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()
+            new_table = f"{table}__new"
+            indexes = [r[0] for r in conn.execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (table,))]
+            # 按SQLite推荐的重建表流程：新建表→复制数据→删除旧表→新表改名→重建索引
+            create_sql = re.sub(r'^CREATE TABLE\s+(?:IF NOT EXISTS\s+)?("?)' + table + r'\1', f'CREATE TABLE "{new_table}"', row[0], count=1)
+            conn.execute(create_sql.replace(LEGACY_PARENT, "users"))
+            conn.execute(f'INSERT INTO "{new_table}" SELECT * FROM "{table}"')
+            conn.execute(f'DROP TABLE "{table}"')
+            conn.execute(f'ALTER TABLE "{new_table}" RENAME TO "{table}"')
+            for sql in indexes:
+                conn.execute(sql)
+            repaired.append(table)
+        for table, column, col_type, source in _missing_columns(conn):
+            conn.execute(f'ALTER TABLE "{table}" ADD COLUMN {column} {col_type}')
+            if source is not None:
+                conn.execute(f'UPDATE "{table}" SET {column} = {source}')
+            repaired.append(f"{table}.{column}")
+        conn.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    return repaired
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else "certificate_system.db"
+    try:
+        items = repair_legacy_schema(path)
+    except Exception as e:
+        raise SystemExit(f"❌ 表结构修复失败，已回滚：{e}")
+    if items:
+        print(f"✅ 已修复：{', '.join(items)}")
+    else:
+        print("✅ 表结构无需修复")
@@ -3,11 +3,105 @@ import base64
 import hashlib
 import time
 import json
+import os
+import tempfile
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import Dict, Optional
 
 # 智谱AI GLM-4V API 地址
 GLM4V_URL = "https://open.bigmodel.cn/api/paas/v4/chat/completions"
+GLM4V_MODEL = "glm-4v"
+# 提示词版本号：修改提示词后需同步修改，旧版本的缓存结果将自动失效
+PROMPT_VERSION = "v1"
+# 识别结果缓存目录：缓存内容含证书上的个人信息，默认关闭，设置环境变量OCR_CACHE_DIR（如ocr_cache）后开启
+OCR_CACHE_DIR = os.environ.get("OCR_CACHE_DIR", "")
+# 请求体中图片URL的占位符（序列化后在此处拆分，写入图片数据）
+_IMAGE_URL_SLOT = "__IMAGE_URL__"
+# 请求体超过该大小时写入磁盘临时文件，而不是保留在内存中
+_BODY_SPOOL_SIZE = 2 * 1024 * 1024
+# 已生成的Token：(api_key, 有效期秒数) -> (token, 过期时间戳)
+_TOKEN_CACHE: Dict[tuple, tuple] = {}
+# Token剩余有效期不足该秒数时重新生成
+_TOKEN_REFRESH_MARGIN = 60
+
+# 复用HTTP连接（keep-alive + TLS会话复用）
+# 接口按次计费且POST不幂等：只在连接失败和429/503（请求未被处理）时退避重试，读超时及500/502/504不重试
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=10,
+    max_retries=Retry(total=3, connect=3, read=0, other=0, backoff_factor=1.0,
+                      status_forcelist=(429, 503), allowed_methods=frozenset(["POST"]),
+                      respect_retry_after_header=False, raise_on_status=False)
+))
+# (连接, 读取)超时（秒）
+_HTTP_TIMEOUT = (5, 60)
+
+
+class ExtractionCache:
+    """按图片内容哈希缓存识别结果（每条结果一个JSON文件）"""
+
+    def __init__(self, cache_dir: str = OCR_CACHE_DIR, model: str = GLM4V_MODEL,
+                 prompt_version: str = PROMPT_VERSION):
+        self.cache_dir = cache_dir
+        self.model = model
+        self.prompt_version = prompt_version
+        self._suffix = f"{model}|{prompt_version}".encode("utf-8")
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.cache_dir)
+
+    def make_key(self, img_base64: str) -> str:
+        """缓存键：sha256(图片长度 + 图片base64 + 模型|提示词版本)"""
+        data = img_base64.encode("ascii")
+        return hashlib.sha256(len(data).to_bytes(8, "little") + data + self._suffix).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict]:
+        """命中返回缓存的API响应，未命中或提示词版本不一致返回None"""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("model") != self.model or entry.get("prompt_version") != self.prompt_version:
+            # 旧版本提示词的结果，删除后重新识别
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return entry.get("response")
+
+    def put(self, key: str, response: Dict) -> None:
+        """写入缓存（先写临时文件再替换，避免并发读到半个文件）"""
+        if not self.enabled:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._path(key)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({
+                    "response": response,
+                    "model": self.model,
+                    "prompt_version": self.prompt_version,
+                    "ts": int(time.time())
+                }, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"写入识别缓存失败: {e}")
+
+
+_extraction_cache = ExtractionCache()
 
 
 def load_api_config(config_path: str = "api_config.json") -> Dict:
@@ -26,7 +120,13 @@ def generate_token(api_key: str, exp_seconds: int = 3600) -> str:
     """
     生成智谱AI所需的JWT Token
     不依赖第三方jwt库，手动实现HMAC-SHA256签名
+    有效期内重复调用直接返回已生成的Token
     """
+    now = int(time.time())
+    cache_key = (api_key, exp_seconds)
+    cached = _TOKEN_CACHE.get(cache_key)
+    if cached and cached[1] - now > _TOKEN_REFRESH_MARGIN:
+        return cached[0]
     try:
         id, secret = api_key.split(".")
     except ValueError:
@@ -36,7 +136,6 @@ def generate_token(api_key: str, exp_seconds: int = 3600) -> str:
     header_json = json.dumps(header, separators=(',', ':'))
     header_b64 = base64.urlsafe_b64encode(header_json.encode('utf-8')).decode('utf-8').rstrip('=')
     # Payload
-    now = int(time.time())
     payload = {
         "api_key": id,
         "exp": now + exp_seconds,
@@ -46,16 +145,26 @@ def generate_token(api_key: str, exp_seconds: int = 3600) -> str:
     payload_b64 = base64.urlsafe_b64encode(payload_json.encode('utf-8')).decode('utf-8').rstrip('=')
     # Signature
     signing_content = f"{header_b64}.{payload_b64}"
-    signature = hmac.new(secret.encode('utf-8'), signing_content.encode('utf-8'), hashlib.sha256).digest()
+    # 单次HMAC计算，摘要算法以名称传入，直接走OpenSSL实现
+    signature = hmac.digest(secret.encode('utf-8'), signing_content.encode('utf-8'), 'sha256')
     signature_b64 = base64.urlsafe_b64encode(signature).decode('utf-8').rstrip('=')
-    return f"{header_b64}.{payload_b64}.{signature_b64}"
+    token = f"{header_b64}.{payload_b64}.{signature_b64}"
+    _TOKEN_CACHE[cache_key] = (token, now + exp_seconds)
+    return token
 
 
 def call_ocr_api(img_base64: str) -> Dict:
     """
     调用GLM-4V API进行图片识别
+    img_base64 为JPEG图片的Base64编码（image_processor.image_to_base64_jpeg）
     返回原始的API响应字典
     """
+    # 同一图片（旋转/缩放结果一致）重复识别时直接返回缓存结果
+    cache_key = _extraction_cache.make_key(img_base64)
+    cached = _extraction_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     config = load_api_config()
     api_key = config.get("glm4v_api_key")
     if not api_key:
@@ -83,21 +192,32 @@ def call_ocr_api(img_base64: str) -> Dict:
             "Content-Type": "application/json"
         }
         data = {
-            "model": "glm-4v",
+            "model": GLM4V_MODEL,
             "messages": [
                 {
                     "role": "user",
                     "content": [
                         {"type": "text", "text": prompt_text},
-                        {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{img_base64}"}}
+                        {"type": "image_url", "image_url": {"url": _IMAGE_URL_SLOT}}
                     ]
                 }
             ],
             "temperature": 0.1
         }
-        response = requests.post(GLM4V_URL, headers=headers, json=data, timeout=60)
+        # 请求体分段写入临时文件并以文件对象发送，requests按块读取上传，不再在内存中拼出完整JSON
+        prefix, suffix = json.dumps(data, ensure_ascii=False).encode("utf-8").split(_IMAGE_URL_SLOT.encode("ascii"))
+        with tempfile.SpooledTemporaryFile(max_size=_BODY_SPOOL_SIZE) as body:
+            body.write(prefix)
+            body.write(b"data:image/jpeg;base64,")
+            body.write(img_base64.encode("ascii"))
+            body.write(suffix)
+            headers["Content-Length"] = str(body.tell())
+            body.seek(0)
+            response = _SESSION.post(GLM4V_URL, headers=headers, data=body, timeout=_HTTP_TIMEOUT)
         response.raise_for_status()
-        return response.json()
+        result = response.json()
+        _extraction_cache.put(cache_key, result)
+        return result
     except requests.exceptions.RequestException as e:
         return {"error": f"网络请求失败: {str(e)}", "raw_response": None}
     except Exception as e:
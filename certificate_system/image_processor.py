@@ -38,15 +38,40 @@ def resize_image(img: Image.Image, size_type: str) -> Image.Image:
     return img
 
 
+def process_image_fast(img: Image.Image, angle: int, size_type: str) -> Image.Image:
+    """
+    先缩放再旋转（旋转只处理缩小后的图片），结果与先旋转再缩放一致
+    :param img: 原始图片对象（JPEG图片在未加载像素前调用，可利用解码时缩小）
+    :param angle: 旋转角度（0/90/180/270）
+    :param size_type: 尺寸类型（A4/A5/custom）
+    :return: 处理后的图片对象
+    """
+    angle %= 360
+    target_size = STANDARD_SIZES.get(size_type, STANDARD_SIZES["custom"])
+    # 旋转90/270度后宽高互换，缩放时按互换后的尺寸限制
+    if angle in (90, 270):
+        target_size = (target_size[1], target_size[0])
+
+    # JPEG解码时直接按2的幂缩小，减少解码和后续缩放的像素量
+    if img.format == "JPEG":
+        img.draft("RGB", target_size)
+
+    img = img.copy()
+    img.thumbnail(target_size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+    if angle == 0:
+        return img
+    return img.rotate(angle, expand=True)
+
+
 def pil_image_to_bytes(img: Image.Image) -> bytes:
     """
-    将PIL图片转换为字节流（用于Streamlit显示）
+    将PIL图片转换为PNG字节流（用于Streamlit显示）
     :param img: PIL图片对象
     :return: 字节流
     """
     buf = BytesIO()
-    img.save(buf, format="PNG")
-    buf.seek(0)
+    # 预览图为临时数据，压缩级别1的编码速度远快于默认级别6
+    img.save(buf, format="PNG", compress_level=1)
     return buf.getvalue()
 
 
@@ -59,4 +84,18 @@ def image_to_base64(img: Image.Image) -> str:
     buf = BytesIO()
     img.save(buf, format="PNG")
     buf.seek(0)
-    return base64.b64encode(buf.getvalue()).decode("utf-8")
\ No newline at end of file
+    return base64.b64encode(buf.getvalue()).decode("utf-8")
+
+
+def image_to_base64_jpeg(img: Image.Image, quality: int = 85) -> str:
+    """
+    将PIL图片转换为JPEG格式的Base64编码（用于API调用，体积远小于PNG）
+    :param img: PIL图片对象
+    :param quality: JPEG质量（1-95）
+    :return: Base64编码字符串
+    """
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    buf = BytesIO()
+    img.save(buf, format="JPEG", quality=quality, optimize=True, progressive=True)
+    return base64.b64encode(buf.getbuffer()).decode("ascii")
\ No newline at end of file
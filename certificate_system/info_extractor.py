@@ -1,5 +1,16 @@
 import json
-from typing import Dict, List, Optional
+import re
+from datetime import datetime
+from typing import Dict, List, Optional, Iterator
+
+try:
+    import fcntl  # POSIX文件锁
+except ImportError:
+    fcntl = None
+try:
+    import msvcrt  # Windows文件锁
+except ImportError:
+    msvcrt = None
 
 # 定义必须提取的10个字段
 REQUIRED_FIELDS = [
@@ -14,6 +25,8 @@ REQUIRED_FIELDS = [
     "award_time",
     "tutor_name"
 ]
+# 匹配内容中第一个"{"到最后一个"}"之间的JSON对象（可跳过Markdown代码块标记等多余文字）
+_JSON_RE = re.compile(r'\{.*\}', re.DOTALL)
 
 
 def parse_api_response(api_response: Dict) -> Dict:
@@ -39,34 +52,23 @@ def parse_api_response(api_response: Dict) -> Dict:
         content = choices[0].get("message", {}).get("content", "")
     except Exception as e:
         return {"status": "failed", "error": f"解析API结构失败: {e}", "data": None}
-    # 3. 清洗内容 (去除Markdown代码块标记)
-    content = content.replace("```json", "").replace("```", "").strip()
-    # 4. 解析JSON
-    json_data = None
+    # 3. 提取并解析JSON对象
+    m = _JSON_RE.search(content)
+    if not m:
+        return {"status": "failed", "error": "未找到有效的JSON数据", "raw_content": content}
     try:
-        json_data = json.loads(content)
+        json_data = json.loads(m.group())
     except json.JSONDecodeError:
-        # 如果直接解析失败，尝试截取第一个JSON对象
-        start_idx = content.find("{")
-        end_idx = content.rfind("}") + 1
-        if start_idx != -1 and end_idx > start_idx:
-            try:
-                json_data = json.loads(content[start_idx:end_idx])
-            except:
-                return {"status": "failed", "error": "无法解析JSON内容", "raw_content": content}
+        return {"status": "failed", "error": "无法解析JSON内容", "raw_content": content}
     if not json_data:
         return {"status": "failed", "error": "未找到有效的JSON数据", "raw_content": content}
-    # 5. 字段对齐与标准化
-    extracted_data = {}
-    missing_fields = []
-    for field in REQUIRED_FIELDS:
-        value = json_data.get(field)
-        if value is None:
-            missing_fields.append(field)
-            extracted_data[field] = ""  # 缺失字段设为空字符串
-        else:
-            extracted_data[field] = str(value).strip()  # 确保是字符串且去除首尾空格
-    # 6. 返回结果
+    # 4. 字段对齐与标准化（缺失字段设为空字符串，其余转为字符串并去除首尾空格）
+    extracted_data = {
+        field: "" if (value := json_data.get(field)) is None else str(value).strip()
+        for field in REQUIRED_FIELDS
+    }
+    missing_fields = [field for field, value in extracted_data.items() if not value]
+    # 5. 返回结果
     result = {
         "status": "success",
         "data": extracted_data
@@ -76,23 +78,47 @@ def parse_api_response(api_response: Dict) -> Dict:
     return result
 
 
-def save_result_to_log(image_name: str, result: Dict, log_file: str = "extraction_results.json"):
+def _lock(f, locked: bool):
+    """对日志文件加锁/解锁（多个进程同时追加写入时避免内容交错）"""
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX if locked else fcntl.LOCK_UN)
+    elif msvcrt is not None:
+        # Windows按字节区域加锁，统一锁定文件首字节
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK if locked else msvcrt.LK_UNLCK, 1)
+
+
+def save_result_to_log(image_name: str, result: Dict, log_file: str = "extraction_results.jsonl"):
     """
-    将提取结果追加保存到日志文件
+    将提取结果追加保存到日志文件（JSONL格式，每行一条记录，只追加不重写）
     """
     log_entry = {
-        "timestamp": __import__('datetime').datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         "image_name": image_name,
         "status": result.get("status"),
         "error": result.get("error"),
         "data": result.get("data")
     }
-    logs = []
+    line = (json.dumps(log_entry, ensure_ascii=False) + "\n").encode("utf-8")
+    with open(log_file, "ab") as f:
+        _lock(f, True)
+        try:
+            f.write(line)
+            f.flush()
+        finally:
+            _lock(f, False)
+
+
+def load_logs(log_file: str = "extraction_results.jsonl") -> Iterator[Dict]:
+    """
+    逐行读取提取结果日志
+    Returns:
+        按写入顺序逐条返回日志记录（文件不存在时不返回任何记录）
+    """
     try:
         with open(log_file, "r", encoding="utf-8") as f:
-            logs = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        logs = []
-    logs.append(log_entry)
-    with open(log_file, "w", encoding="utf-8") as f:
-        json.dump(logs, f, ensure_ascii=False, indent=2)
\ No newline at end of file
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    except FileNotFoundError:
+        return
\ No newline at end of file
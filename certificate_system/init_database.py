@@ -1,11 +1,21 @@
 import sqlite3
 import bcrypt
 
+# bcrypt计算强度：与auth_system.BCRYPT_ROUNDS保持一致（登录验证只使用bcrypt）
+BCRYPT_ROUNDS = 10
+
 def init_database():
     """初始化数据库（整合所有表结构 + 初始化默认数据）"""
     conn = sqlite3.connect("certificate_system.db")
     cursor = conn.cursor()
 
+    # 0. WAL模式（写入数据库文件，对之后所有连接生效）：读写互不阻塞，提交时fsync更少
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA cache_size=-20000")  # 20MB页缓存
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")  # 256MB内存映射读
+
     # 1. 用户表（兼容原有结构 + 约束）
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS users (
@@ -70,6 +80,13 @@ def init_database():
     )
     ''')
 
+    # 常用查询条件的索引（与auth_system.init_database保持一致）
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_files_user_upload ON files(user_id, upload_time DESC)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_files_dup ON files(user_id, file_name, file_size)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_cert_file ON certificate_info(file_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_cert_user_submitted ON certificate_info(user_id, is_submitted)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_role ON users(role)")
+
     # 5. 初始化系统配置（提交截止时间）
     cursor.execute("SELECT 1 FROM system_config WHERE config_key = 'submit_deadline'")
     if not cursor.fetchone():
@@ -84,7 +101,7 @@ def init_database():
     if not cursor.fetchone():
         # 密码：Admin123456（bcrypt加密）
         password = "Admin123456"
-        salt = bcrypt.gensalt()
+        salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
         password_hash = bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
         cursor.execute('''
         INSERT INTO users (account_id, name, role, department, email, password_hash)
@@ -1,8 +1,7 @@
 import os
 import fitz  # PyMuPDF，需安装：pip install pymupdf
 from PIL import Image
-import io
-from typing import Optional, Tuple
+from typing import Optional
 
 
 def pdf_to_image(pdf_bytes: bytes, dpi: int = 300) -> Optional[Image.Image]:
@@ -27,11 +26,10 @@ def pdf_to_image(pdf_bytes: bytes, dpi: int = 300) -> Optional[Image.Image]:
         page = doc[0]
         # 设置分辨率
         mat = fitz.Matrix(dpi / 72, dpi / 72)  # 72是PDF默认DPI
-        pix = page.get_pixmap(matrix=mat)
+        pix = page.get_pixmap(matrix=mat, alpha=False)
 
-        # 转换为PIL Image
-        img_bytes = pix.tobytes("png")
-        img = Image.open(io.BytesIO(img_bytes))
+        # 像素数据直接构造PIL Image（无需PNG编码再解码）；alpha=False渲染的像素固定为RGB三通道
+        img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
         doc.close()
         return img
 
@@ -3,7 +3,7 @@ import os
 from PIL import Image
 import io
 from pdf_converter import pdf_to_image
-from image_processor import process_image, pil_image_to_bytes, STANDARD_SIZES
+from image_processor import process_image_fast, image_to_base64_jpeg, STANDARD_SIZES
 from file_validator import validate_upload_file
 
 # 页面配置
@@ -63,15 +63,16 @@ def render_certificate_preview(user_id: int):
                 img = Image.open(uploaded_file)
 
             # 图片处理（旋转+尺寸）
-            processed_img, base64_str = process_image(img, rotate_angle, target_size)
+            processed_img = process_image_fast(img, rotate_angle, target_size)
+            # 与glm4v_api.call_ocr_api声明的data:image/jpeg一致，按JPEG编码
+            base64_str = image_to_base64_jpeg(processed_img)
 
             # 4. 预览区域
             with col2:
                 st.info("✅ 文件处理完成，预览如下：")
-                # 转换为二进制用于Streamlit预览
-                img_bytes = pil_image_to_bytes(processed_img)
+                # st.image直接接收PIL图片，无需先编码为字节流
                 st.image(
-                    img_bytes,
+                    processed_img,
                     caption=f"预览图（尺寸：{processed_img.size[0]}x{processed_img.size[1]}）",
                     use_column_width=False,
                     width=400
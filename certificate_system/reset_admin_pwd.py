@@ -1,14 +1,10 @@
 import sqlite3
-from passlib.context import CryptContext
+import bcrypt
 
-# 1. 配置密码加密（和系统验证逻辑完全一致）
-pwd_context = CryptContext(
-    schemes=["pbkdf2_sha256"],
-    default="pbkdf2_sha256",
-    pbkdf2_sha256__default_rounds=600000
-)
+# 1. 配置密码加密（和系统验证逻辑完全一致：bcrypt，计算强度同auth_system.BCRYPT_ROUNDS）
+BCRYPT_ROUNDS = 10
 # 生成密码admin的正确哈希值
-admin_hash = pwd_context.hash("admin")
+admin_hash = bcrypt.hashpw("admin".encode('utf-8'), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode('utf-8')
 
 # 2. 连接数据库并重置密码
 conn = sqlite3.connect("certificate_system.db")
@@ -1,56 +1,71 @@
 import sqlite3
 
-# 连接数据库
-conn = sqlite3.connect("certificate_system.db")
-cursor = conn.cursor()
-
-# 1. 先备份旧users表数据（如果有）
-cursor.execute("ALTER TABLE users RENAME TO users_old")
+# bcrypt计算强度：与auth_system.BCRYPT_ROUNDS保持一致
+BCRYPT_ROUNDS = 10
 
-# 2. 重新创建带account_id列的users表
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS users (
-    user_id INTEGER PRIMARY KEY AUTOINCREMENT,
-    account_id TEXT UNIQUE NOT NULL,
-    name TEXT NOT NULL,
-    role TEXT NOT NULL CHECK(role IN ('student', 'teacher', 'admin')),
-    department TEXT NOT NULL,
-    email TEXT,
-    password_hash TEXT NOT NULL,
-    is_active INTEGER DEFAULT 1,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-)
-''')
+# 连接数据库（isolation_level=None：事务由下面的脚本显式控制）
+conn = sqlite3.connect("certificate_system.db", isolation_level=None)
+cursor = conn.cursor()
 
-# 3. 迁移旧数据（如果旧表有数据，根据实际列名调整）
-# 先查看旧表结构
-cursor.execute("PRAGMA table_info(users_old);")
+# 1. 先查看旧表结构
+cursor.execute("PRAGMA table_info(users);")
 old_columns = [col[1] for col in cursor.fetchall()]
 print("旧表列名：", old_columns)
 
-# 如果旧表有类似账号的列（比如id/student_id等），替换下面的迁移逻辑
+# 2. 迁移旧数据（如果旧表有类似账号的列（比如id/student_id等），替换下面的迁移逻辑）
+# 示例：假设旧表用user_id作为账号，迁移到account_id
+migrate_columns = ["user_id", "name", "role", "department", "email", "password_hash", "is_active"]
+can_migrate = all(col in old_columns for col in migrate_columns)
+migrate_sql = '''
+INSERT INTO users_new (account_id, name, role, department, email, password_hash, is_active)
+SELECT CAST(user_id AS TEXT), name, role, department, email, password_hash, is_active
+FROM users;
+''' if can_migrate else ""
+
+# 3. 按SQLite推荐的重建表流程在一个事务中完成：新建表→迁移数据→删除旧表→新表改名
+# 不再把旧表重命名为users_old，否则files/certificate_info的外键会被一并改写为指向users_old
+conn.execute("PRAGMA foreign_keys = OFF")
 try:
-    # 示例：假设旧表用user_id作为账号，迁移到account_id
-    cursor.execute('''
-    INSERT INTO users (account_id, name, role, department, email, password_hash, is_active)
-    SELECT CAST(user_id AS TEXT), name, role, department, email, password_hash, is_active 
-    FROM users_old
+    conn.executescript(f'''
+    BEGIN EXCLUSIVE;
+
+    CREATE TABLE users_new (
+        user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        account_id TEXT UNIQUE NOT NULL,
+        name TEXT NOT NULL,
+        role TEXT NOT NULL CHECK(role IN ('student', 'teacher', 'admin')),
+        department TEXT NOT NULL,
+        email TEXT,
+        password_hash TEXT NOT NULL,
+        is_active INTEGER DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    {migrate_sql}
+    DROP TABLE users;
+    ALTER TABLE users_new RENAME TO users;
+    CREATE INDEX IF NOT EXISTS idx_users_role ON users(role);
+
+    COMMIT;
     ''')
-    print("旧数据迁移成功")
+    print("旧数据迁移成功" if can_migrate else "旧表无可迁移的列，未迁移旧数据")
 except Exception as e:
-    print("数据迁移失败（无旧数据）：", e)
-
-# 4. 删除旧表
-cursor.execute("DROP TABLE IF EXISTS users_old")
+    # 任一步失败整体回滚，数据库保持迁移前的状态
+    if conn.in_transaction:
+        conn.execute("ROLLBACK")
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.close()
+    raise SystemExit(f"表结构修复失败，已回滚：{e}")
+conn.execute("PRAGMA foreign_keys = ON")
 
-# 5. 重新初始化管理员账号
+# 4. 重新初始化管理员账号（单独的事务）
 admin_account = "88888888"
 cursor.execute("SELECT 1 FROM users WHERE account_id = ?", (admin_account,))
 if not cursor.fetchone():
     import bcrypt
     password = "Admin123456"
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
     password_hash = bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+    cursor.execute("BEGIN")
     cursor.execute('''
     INSERT INTO users (account_id, name, role, department, email, password_hash)
     VALUES (?, ?, ?, ?, ?, ?)
@@ -62,7 +77,7 @@ if not cursor.fetchone():
         "admin@school.edu.cn",
         password_hash
     ))
+    cursor.execute("COMMIT")
 
-conn.commit()
 conn.close()
 print("表结构修复完成！")
\ No newline at end of file
@@ -0,0 +1,36 @@
+import os
+import sys
+
+import pytest
+
+# 业务模块均位于certificate_system目录下，按模块名直接导入
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+
+USERS_DDL = '''
+CREATE TABLE users (
+    user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    account_id TEXT UNIQUE NOT NULL,
+    name TEXT NOT NULL,
+    role TEXT NOT NULL CHECK(role IN ('student', 'teacher', 'admin')),
+    department TEXT NOT NULL,
+    email TEXT,
+    password_hash TEXT NOT NULL,
+    is_active INTEGER DEFAULT 1,
+    created_by TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+'''
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """指向临时数据库的共享连接（已建好users表）"""
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "test.db"))
+    monkeypatch.setattr(database, "_conn", None)
+    conn = database.get_connection()
+    conn.execute(USERS_DDL)
+    conn.execute("CREATE INDEX idx_users_role ON users(role)")
+    yield conn
+    conn.close()
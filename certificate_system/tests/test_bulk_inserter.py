@@ -0,0 +1,60 @@
+from database import BulkInserter
+
+
+def _add_user(conn, account_id, name="原姓名", password_hash="OLD_HASH"):
+    conn.execute("INSERT INTO users (account_id, name, role, department, email, password_hash) "
+                 "VALUES (?, ?, 'teacher', '原单位', 'old@x.cn', ?)", (account_id, name, password_hash))
+
+
+def _row(account_id, name, role="teacher", password_hash="NEW_HASH"):
+    return (account_id, name, role, "计算机学院", "a@x.cn", password_hash, "admin_import")
+
+
+def _flush(conn, rows, **kwargs):
+    inserter = BulkInserter(conn, **kwargs)
+    conn.execute("BEGIN IMMEDIATE")
+    results = inserter.flush(rows)
+    conn.commit()
+    return results
+
+
+def test_insert_reports_each_row(db):
+    _add_user(db, "11111111")
+    rows = [_row("11111111", "已存在"), _row("22222222", "新用户"), _row("22222222", "批内重复"),
+            _row("33333333", "角色无效", role="bad")]
+    assert _flush(db, rows) == [False, True, False, False]
+    users = dict(db.execute("SELECT account_id, name FROM users"))
+    assert users == {"11111111": "原姓名", "22222222": "新用户"}
+
+
+def test_insert_all_success_in_small_batches(db):
+    rows = [_row(f"{i:08d}", f"用户{i}") for i in range(10)]
+    assert _flush(db, rows, batch_size=3) == [True] * 10
+    assert db.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 10
+
+
+def test_upsert_updates_existing_without_touching_password(db):
+    _add_user(db, "11111111")
+    rows = [_row("11111111", "新姓名", password_hash=""), _row("22222222", "新用户"),
+            _row("22222222", "批内重复"), _row("33333333", "角色无效", role="bad")]
+    assert _flush(db, rows, update_existing=True, batch_size=2) == [True, True, True, False]
+    users = {r[0]: r[1:] for r in db.execute("SELECT account_id, name, department, password_hash FROM users")}
+    assert users["11111111"] == ("新姓名", "计算机学院", "OLD_HASH")
+    # 批内重复的账号：后一行更新前一行插入的记录，密码仍为首次插入的值
+    assert users["22222222"] == ("批内重复", "计算机学院", "NEW_HASH")
+    assert "33333333" not in users
+
+
+def test_upsert_failed_update_is_not_reported_as_success(db):
+    _add_user(db, "11111111")
+    assert _flush(db, [_row("11111111", "新姓名", role="bad", password_hash="")], update_existing=True) == [False]
+    assert db.execute("SELECT name, role FROM users").fetchone() == ("原姓名", "teacher")
+
+
+def test_existing_accounts_only_returns_queried_keys(db):
+    for i in range(0, 1200, 2):
+        _add_user(db, f"{i:08d}")
+    inserter = BulkInserter(db)
+    keys = [f"{i:08d}" for i in range(1000)]
+    assert inserter.existing_accounts(keys) == {f"{i:08d}" for i in range(0, 1000, 2)}
+    assert inserter.existing_accounts([]) == set()
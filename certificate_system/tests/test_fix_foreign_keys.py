@@ -0,0 +1,103 @@
+import sqlite3
+
+from fix_foreign_keys import repair_legacy_schema
+
+
+def _make_legacy_db(path):
+    """按旧版迁移的方式建库：users改名为users_old后，子表外键被SQLite改写为指向users_old"""
+    conn = sqlite3.connect(path)
+    conn.executescript('''
+    CREATE TABLE users (user_id INTEGER PRIMARY KEY AUTOINCREMENT, account_id TEXT UNIQUE NOT NULL);
+    CREATE TABLE files (
+        file_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        file_name TEXT NOT NULL,
+        remark TEXT,
+        FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+    );
+    CREATE TABLE certificate_info (
+        cert_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        file_id INTEGER NOT NULL,
+        updated_at TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
+        FOREIGN KEY (file_id) REFERENCES files(file_id) ON DELETE CASCADE
+    );
+    CREATE INDEX idx_files_user ON files(user_id);
+    INSERT INTO users (account_id) VALUES ('88888888');
+    INSERT INTO files (user_id, file_name, remark) VALUES (1, 'a.pdf', '保留的列');
+    INSERT INTO files (user_id, file_name, remark) VALUES (1, 'b.pdf', NULL);
+    INSERT INTO certificate_info (user_id, file_id, updated_at) VALUES (1, 1, '2025-01-01 08:00:00');
+    INSERT INTO certificate_info (user_id, file_id, updated_at) VALUES (1, 2, '2025-01-02 08:00:00');
+
+    ALTER TABLE users RENAME TO users_old;
+    CREATE TABLE users (user_id INTEGER PRIMARY KEY AUTOINCREMENT, account_id TEXT UNIQUE NOT NULL);
+    INSERT INTO users SELECT * FROM users_old;
+    DROP TABLE users_old;
+    ''')
+    conn.close()
+
+
+def _schema(conn, table):
+    return conn.execute("SELECT sql FROM sqlite_master WHERE name = ?", (table,)).fetchone()[0]
+
+
+def test_repair_keeps_data_and_restores_cascade(tmp_path):
+    path = str(tmp_path / "legacy.db")
+    _make_legacy_db(path)
+    conn = sqlite3.connect(path)
+    assert "users_old" in _schema(conn, "files")
+    before_files = conn.execute("SELECT * FROM files ORDER BY file_id").fetchall()
+    before_certs = conn.execute("SELECT * FROM certificate_info ORDER BY cert_id").fetchall()
+    conn.close()
+
+    assert repair_legacy_schema(path) == ["files", "certificate_info", "certificate_info.created_at",
+                                          "users.created_by"]
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA foreign_keys = ON")
+    for table in ("files", "certificate_info"):
+        assert "users_old" not in _schema(conn, table)
+    # 原有列和数据原样保留（不丢弃多出的列、不改值），缺少的created_at按updated_at回填
+    assert conn.execute("SELECT * FROM files ORDER BY file_id").fetchall() == before_files
+    assert conn.execute(
+        "SELECT cert_id, user_id, file_id, updated_at FROM certificate_info ORDER BY cert_id").fetchall() == before_certs
+    assert [r[1] for r in conn.execute("PRAGMA table_info(certificate_info)")] == [
+        "cert_id", "user_id", "file_id", "updated_at", "created_at"]
+    assert conn.execute("SELECT COUNT(*) FROM certificate_info WHERE created_at IS NOT updated_at").fetchone()[0] == 0
+    assert _schema(conn, "idx_files_user") is not None
+    # 已有用户的created_by取列默认值
+    assert conn.execute("SELECT account_id, created_by FROM users").fetchall() == [("88888888", "self_register")]
+    assert conn.execute("PRAGMA foreign_key_check").fetchall() == []
+
+    # 删除文件时证书信息级联删除
+    conn.execute("DELETE FROM files WHERE file_id = 1")
+    conn.commit()
+    assert conn.execute("SELECT file_id FROM certificate_info").fetchall() == [(2,)]
+    conn.close()
+
+
+def test_repair_is_idempotent(tmp_path):
+    path = str(tmp_path / "legacy.db")
+    _make_legacy_db(path)
+    repair_legacy_schema(path)
+    conn = sqlite3.connect(path)
+    schema = conn.execute("SELECT name, sql FROM sqlite_master ORDER BY name").fetchall()
+    conn.close()
+
+    assert repair_legacy_schema(path) == []
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT name, sql FROM sqlite_master ORDER BY name").fetchall() == schema
+    conn.close()
+
+
+def test_current_schema_is_left_alone(tmp_path):
+    path = str(tmp_path / "current.db")
+    conn = sqlite3.connect(path)
+    conn.executescript('''
+    CREATE TABLE users (user_id INTEGER PRIMARY KEY AUTOINCREMENT, created_by TEXT);
+    CREATE TABLE files (file_id INTEGER PRIMARY KEY, user_id INTEGER REFERENCES users(user_id));
+    CREATE TABLE certificate_info (cert_id INTEGER PRIMARY KEY, created_at TIMESTAMP, updated_at TIMESTAMP);
+    ''')
+    conn.close()
+    assert repair_legacy_schema(path) == []
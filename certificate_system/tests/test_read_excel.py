@@ -0,0 +1,27 @@
+import pandas as pd
+import pytest
+
+import user_import
+
+HEADER = ["学（工）号", "姓名", "角色类型", "单位", "邮箱", "初始密码"]
+
+
+def test_polars_and_pandas_read_numeric_cells_identically(tmp_path, monkeypatch):
+    pytest.importorskip("polars")
+    openpyxl = pytest.importorskip("openpyxl")
+    path = str(tmp_path / "users.xlsx")
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(HEADER)
+    ws.append([2023000000001, "张三", "学生", "计院", "c@x.cn", 12345678])
+    ws.append([12345678.0, "李四", "教师", "计院", "b@x.cn", 87654321.0])
+    ws.append(["22222222", "王五", "教师", "计院", "d@x.cn", 1.5])
+    wb.save(path)
+
+    via_polars = user_import._read_excel_whole(path)
+    monkeypatch.setattr(user_import, "pl", None)
+    via_pandas = user_import._read_excel_whole(path)
+
+    assert via_polars["学（工）号"].tolist() == ["2023000000001", "12345678", "22222222"]
+    assert via_polars["初始密码"].tolist() == ["12345678", "87654321", "1.5"]
+    pd.testing.assert_frame_equal(via_polars[via_pandas.columns], via_pandas)
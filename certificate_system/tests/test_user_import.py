@@ -0,0 +1,92 @@
+import pandas as pd
+import pytest
+
+import user_import
+
+HEADER = ["学（工）号", "姓名", "角色类型", "单位", "邮箱", "初始密码"]
+ROWS = [
+    ["11111111", "已存在", "教师", "计院", "a@x.cn", ""],
+    ["22222222", "李四", "教师", "计院", "b@x.cn", "abc12345"],
+    ["2023000000001", "张三", "学生", "计院", "c@x.cn", ""],
+    ["22222222", "李四重复", "教师", "计院", "b@x.cn", "abc12345"],
+    ["123", "学号过短", "学生", "计院", "d@x.cn", ""],
+    ["33333333", "角色无效", "校长", "计院", "e@x.cn", ""],
+]
+
+
+@pytest.fixture
+def users_csv(tmp_path):
+    path = tmp_path / "users.csv"
+    pd.DataFrame(ROWS, columns=HEADER).to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture
+def existing_user(db):
+    db.execute("INSERT INTO users (account_id, name, role, department, email, password_hash) "
+               "VALUES ('11111111', '原姓名', 'teacher', '原单位', 'old@x.cn', 'OLD_HASH')")
+    return db
+
+
+def _statuses(report):
+    return [(d["row"], d["status"]) for d in report["details"]]
+
+
+def test_import_in_chunks(existing_user, users_csv):
+    # 每批2行：第4行的重复账号在上一批已提交，由下一批的判重查询识别
+    report = user_import.import_users_from_excel(users_csv, chunk_size=2)
+    assert report["success"]
+    assert report["stats"] == {"total": 6, "success": 2, "failed": 2, "duplicate": 2, "updated": 0}
+    assert _statuses(report) == [(2, "重复"), (3, "成功"), (4, "成功"), (5, "重复"), (6, "失败"), (7, "失败")]
+    passwords = {d["account_id"]: d["password"] for d in report["details"] if d["status"] == "成功"}
+    assert passwords["22222222"] == "abc12345"
+    assert len(passwords["2023000000001"]) == 8
+
+
+def test_import_duplicate_within_one_chunk(existing_user, users_csv):
+    report = user_import.import_users_from_excel(users_csv)
+    assert report["stats"]["duplicate"] == 2
+    assert existing_user.execute("SELECT name FROM users WHERE account_id = '22222222'").fetchone()[0] == "李四"
+
+
+def test_import_update_existing(existing_user, users_csv):
+    report = user_import.import_users_from_excel(users_csv, update_existing=True, chunk_size=2)
+    assert report["stats"] == {"total": 6, "success": 2, "failed": 2, "duplicate": 0, "updated": 2}
+    assert _statuses(report)[:4] == [(2, "更新"), (3, "成功"), (4, "成功"), (5, "更新")]
+    # 已有用户只更新基本信息，不改动原密码
+    assert existing_user.execute(
+        "SELECT name, department, password_hash FROM users WHERE account_id = '11111111'"
+    ).fetchone() == ("已存在", "计院", "OLD_HASH")
+    assert "password" not in report["details"][0]
+
+
+def test_import_keeps_secondary_indexes_by_default(existing_user, users_csv, monkeypatch):
+    monkeypatch.setattr(user_import, "_DEFER_INDEX_MIN_ROWS", 1)
+    dropped = []
+    monkeypatch.setattr(user_import, "_drop_secondary_user_indexes", lambda conn: dropped.append(conn) or [])
+    user_import.import_users_from_excel(users_csv, chunk_size=2)
+    assert dropped == []
+
+
+def test_failed_chunk_is_rolled_back(existing_user, users_csv, monkeypatch):
+    def fail(self, rows):
+        raise RuntimeError("disk full")
+    monkeypatch.setattr(user_import.BulkInserter, "flush", fail)
+    report = user_import.import_users_from_excel(users_csv)
+    assert not report["success"]
+    assert "disk full" in report["message"]
+    assert not existing_user.in_transaction
+    assert existing_user.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 1
+
+
+def test_import_accepts_english_roles_and_checks_passwords(db, tmp_path):
+    path = tmp_path / "users.csv"
+    pd.DataFrame([
+        ["44444444", "王五", "Teacher", "计院", "f@x.cn", "abc12345"],
+        ["55555555", "赵六", "admin", "计院", "g@x.cn", "12345678"],
+        ["66666666", "孙七", "teacher", "计院", "h@x.cn", "abc1"],
+    ], columns=HEADER).to_csv(path, index=False)
+    report = user_import.import_users_from_excel(str(path))
+    assert _statuses(report) == [(2, "成功"), (3, "失败"), (4, "失败")]
+    assert report["details"][1]["reason"] == "初始密码不符合要求"
+    assert db.execute("SELECT account_id, role FROM users").fetchall() == [("44444444", "teacher")]
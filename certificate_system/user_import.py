@@ -1,172 +1,404 @@
+import os
+import json
+import sqlite3
+import itertools
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import random
 import string
 from database import (
-    check_account_exists,
-    validate_account_format,
-    create_user,
-    get_user_by_account
+    get_connection,
+    connection_lock,
+    hash_password,
+    BulkInserter
 )
-from typing import Dict, List, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import python_calamine  # noqa: F401  Rust实现的xlsx解析引擎（pandas>=2.2），不可用时退回openpyxl
+    _EXCEL_ENGINE = "calamine"
+except ImportError:
+    _EXCEL_ENGINE = "openpyxl"
+
+try:
+    import polars as pl  # polars的xlsx读取（calamine解析，直接产出Arrow列）比pandas更快，不可用时使用pandas
+except ImportError:
+    pl = None
+
+# 必填列
+REQUIRED_COLUMNS = ["学（工）号", "姓名", "角色类型", "单位", "邮箱"]
+# 角色映射（统一为英文，中文或英文均可）
+ROLE_MAP = {"学生": "student", "教师": "teacher", "管理员": "admin",
+            "student": "student", "teacher": "teacher", "admin": "admin"}
+# 初始密码要求：至少8位，且同时包含字母和数字（与auth_system注册规则一致）
+_PASSWORD_PATTERN = r"(?=.*[^\W\d_])(?=.*\d).{8,}"
+# 导入用到的列（其余列不解析），全部按字符串读取，跳过类型推断
+_IMPORT_COLUMNS = (*REQUIRED_COLUMNS, "初始密码")
+_IMPORT_DTYPES = {col: "string" for col in _IMPORT_COLUMNS}
+# 每批处理的行数：逐批读取→校验→插入→提交，内存占用只与批大小有关
+IMPORT_CHUNK_SIZE = 10000
+# 待加密密码达到该数量时才交给进程池并行计算bcrypt，数量少时进程间传输的开销不划算
+_PARALLEL_HASH_MIN = 16
+# 离线导入（defer_indexes=True）行数超过该值时，导入期间删除users表的非唯一二级索引，结束后一次性重建
+_DEFER_INDEX_MIN_ROWS = 5000
+# 超过该大小的xlsx改用openpyxl只读模式逐行流式读取，较小的文件整表读取更快
+_STREAM_MIN_BYTES = 20 * 1024 * 1024
+
+
+# 随机密码字符集（字母+数字）；密码用于真实登录，使用系统级安全随机源
+_PASSWORD_ALPHABET = string.ascii_letters + string.digits
+_SECURE_RANDOM = random.SystemRandom()
 
 
 def generate_random_password(length: int = 8) -> str:
     """生成随机密码（字母+数字）"""
-    letters = string.ascii_letters
-    digits = string.digits
-    all_chars = letters + digits
-    return ''.join(random.choice(all_chars) for _ in range(length))
+    return ''.join(_SECURE_RANDOM.choices(_PASSWORD_ALPHABET, k=length))
+
+
+def _chunk_frame(rows: list, columns: list, offset: int) -> pd.DataFrame:
+    """将流式读取的一批行组装为DataFrame（索引延续整表的数据行序号）"""
+    df = pd.DataFrame(rows, columns=columns, index=range(offset, offset + len(rows)))
+    return df.astype({col: "string" for col in columns})
+
+
+def _read_excel_whole(file_path: str) -> pd.DataFrame:
+    """整表读取xlsx（只保留导入用到的列，全部为字符串）"""
+    if pl is None:
+        return pd.read_excel(file_path, engine=_EXCEL_ENGINE,
+                             usecols=lambda c: c in _IMPORT_COLUMNS, dtype=_IMPORT_DTYPES)
+    # infer_schema_length=0：所有列按字符串读取，跳过类型推断
+    df = pl.read_excel(file_path, engine="calamine", infer_schema_length=0, raise_if_empty=False)
+    df = df.select([col for col in df.columns if col in _IMPORT_COLUMNS])
+    # 整数数字单元格按字符串读取时会带上".0"（如学号、纯数字初始密码），所有列统一去掉，与pandas读取结果一致
+    df = df.with_columns(pl.all().str.replace(r"^(-?\d+)\.0$", "${1}"))
+    return df.to_pandas().astype({col: "string" for col in df.columns})
 
 
-def validate_excel_file(file_path: str) -> Tuple[bool, List[str], pd.DataFrame]:
-    """验证Excel文件格式"""
+def _read_chunks(file_path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """
+    按批读取导入文件，每批最多chunk_size行
+    DataFrame索引为数据行序号（Excel行号 = 索引 + 2），只包含导入用到的列
+    """
+    # 初始密码列可选，usecols用函数筛选，缺列时不报错
+    if file_path.lower().endswith(".csv"):
+        # 超大名单可导出为CSV，解析速度远快于任何xlsx引擎，且pandas原生支持分块读取
+        yield from pd.read_csv(file_path, usecols=lambda c: c in _IMPORT_COLUMNS,
+                               dtype=_IMPORT_DTYPES, chunksize=chunk_size)
+        return
+
+    if os.path.getsize(file_path) < _STREAM_MIN_BYTES:
+        df = _read_excel_whole(file_path)
+        for start in range(0, max(len(df), 1), chunk_size):
+            yield df.iloc[start:start + chunk_size]
+        return
+
+    import openpyxl
+    wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = next(rows, ())
+        keep = [i for i, col in enumerate(header) if col in _IMPORT_COLUMNS]
+        columns = [header[i] for i in keep]
+        chunk = []
+        offset = 0
+        for row in rows:
+            chunk.append([row[i] if i < len(row) else None for i in keep])
+            if len(chunk) == chunk_size:
+                yield _chunk_frame(chunk, columns, offset)
+                offset += len(chunk)
+                chunk = []
+        if chunk or offset == 0:
+            yield _chunk_frame(chunk, columns, offset)
+    finally:
+        wb.close()
+
+
+def validate_excel_file(file_path: str, chunk_size: int = IMPORT_CHUNK_SIZE) -> Tuple[bool, List[str], Iterator[pd.DataFrame]]:
+    """
+    验证Excel文件格式（读取首批数据检查必填列）
+    :return: (是否有效, 错误信息, 按批产出的DataFrame，已去除必填列为空的行)
+    """
     errors = []
     try:
-        df = pd.read_excel(file_path)
-        # 检查必填列
-        required_columns = ["学（工）号", "姓名", "角色类型", "单位", "邮箱"]
-        missing_cols = [col for col in required_columns if col not in df.columns]
-        if missing_cols:
-            errors.append(f"缺失必填列：{', '.join(missing_cols)}")
-            return False, errors, df
-
-        # 检查数据非空
-        df = df.dropna(subset=required_columns)
-        if len(df) == 0:
-            errors.append("Excel文件中无有效数据（必填列存在空值）")
-            return False, errors, df
-
-        return True, errors, df
+        chunks = _read_chunks(file_path, chunk_size)
+        first = next(chunks, None)
     except Exception as e:
         errors.append(f"读取Excel文件失败：{str(e)}")
-        return False, errors, pd.DataFrame()
+        return False, errors, iter(())
+
+    if first is None:
+        errors.append("Excel文件中无有效数据（必填列存在空值）")
+        return False, errors, iter(())
+
+    # 检查必填列
+    missing_cols = [col for col in REQUIRED_COLUMNS if col not in first.columns]
+    if missing_cols:
+        errors.append(f"缺失必填列：{', '.join(missing_cols)}")
+        return False, errors, iter(())
+
+    # 检查数据非空（逐批去除必填列存在空值的行）
+    return True, errors, (chunk.dropna(subset=REQUIRED_COLUMNS) for chunk in itertools.chain([first], chunks))
+
+
+class ImportResult:
+    """单行导入明细（__slots__对象比dict更小、构造更快，生成报告时再转为dict）"""
+    __slots__ = ("row", "account_id", "name", "status", "reason", "password")
+
+    def __init__(self, row: int, account_id: str, name: str, status: str, reason: str = "", password: str = None):
+        self.row = row
+        self.account_id = account_id
+        self.name = name
+        self.status = status
+        self.reason = reason
+        self.password = password
+
+    def to_dict(self) -> dict:
+        """转为报告中的dict（仅导入成功的行带password）"""
+        detail = {"row": self.row, "account_id": self.account_id, "name": self.name,
+                  "status": self.status, "reason": self.reason}
+        if self.password is not None:
+            detail["password"] = self.password
+        return detail
 
 
-def import_users_from_excel(file_path: str, update_existing: bool = False) -> Dict[str, any]:
+def _hash_passwords(passwords: List[str], pool: ProcessPoolExecutor = None) -> List[str]:
+    """批量bcrypt加密（纯CPU计算，数量足够时分发到进程池多核并行）"""
+    if pool is None or len(passwords) < _PARALLEL_HASH_MIN:
+        return [hash_password(pw) for pw in passwords]
+    return list(pool.map(hash_password, passwords, chunksize=32))
+
+
+def _import_chunk(conn, inserter: BulkInserter, df: pd.DataFrame, update_existing: bool,
+                  hash_pool: ProcessPoolExecutor = None) -> Tuple[Dict[str, int], List[str], List[ImportResult]]:
     """
-    从Excel批量导入用户
-    :param file_path: Excel文件路径
-    :param update_existing: 是否更新已存在的用户（False则跳过）
+    校验并插入一批记录（本批插入在一个事务中提交；密码加密在事务之外完成，不长时间占用写锁）
+    :param inserter: 整个导入共用的批量插入器（复用同一条预编译语句）
+    :param hash_pool: 用于并行加密密码的进程池
+    :return: (本批统计, 本批错误信息, 本批明细（按行号排序）)
+    """
+    stats = {"total": len(df), "success": 0, "failed": 0, "duplicate": 0, "updated": 0}
+    errors = []
+    # 明细按行号预分配位置直接赋值（索引为数据行序号，去除空行后可能有空位）
+    base = df.index[0] if len(df) else 0
+    details = [None] * (df.index[-1] - base + 1 if len(df) else 0)
+
+    # 整列向量化清洗（去空格、角色映射为英文），不再逐行转换
+    # 各读取路径已按string类型读入，直接调用.str方法，不再重复转换类型
+    for col in ("学（工）号", "姓名", "单位", "邮箱"):
+        df[col] = df[col].str.strip()
+    df["role_en"] = df["角色类型"].str.strip().str.lower().map(ROLE_MAP)
+
+    # 角色类型无效的行一次性筛出
+    bad_role = df["role_en"].isna()
+    for idx, account_id, name in zip(df.index[bad_role], df.loc[bad_role, "学（工）号"], df.loc[bad_role, "姓名"]):
+        row_num = idx + 2  # Excel行号（从2开始）
+        errors.append(f"第{row_num}行：角色类型无效（仅支持学生/教师/管理员）")
+        details[idx - base] = ImportResult(row_num, account_id, name, "失败", "角色类型无效")
+    stats["failed"] += int(bad_role.sum())
+    df = df[~bad_role]
+
+    # 学/工号格式整列校验（学生13位，教师/管理员8位，均为数字）
+    account_len = df["role_en"].map({"student": 13}).fillna(8)
+    format_ok = (df["学（工）号"].str.len() == account_len) & df["学（工）号"].str.fullmatch(r"\d+")
+    bad_format = ~format_ok.fillna(False).astype(bool)
+    for idx, account_id, name, role in zip(df.index[bad_format], df.loc[bad_format, "学（工）号"],
+                                           df.loc[bad_format, "姓名"], df.loc[bad_format, "role_en"]):
+        row_num = idx + 2  # Excel行号（从2开始）
+        errors.append(f"第{row_num}行：{role}学/工号格式错误（学生13位，教师/管理员8位）")
+        details[idx - base] = ImportResult(row_num, account_id, name, "失败", f"{role}学/工号格式错误")
+    stats["failed"] += int(bad_format.sum())
+    df = df[~bad_format]
+
+    # 填写了初始密码但不满足密码要求的行一次性筛出
+    if "初始密码" not in df.columns:
+        df["初始密码"] = pd.Series(pd.NA, index=df.index, dtype="string")
+    bad_password = ~df["初始密码"].str.fullmatch(_PASSWORD_PATTERN).fillna(True).astype(bool)
+    for idx, account_id, name in zip(df.index[bad_password], df.loc[bad_password, "学（工）号"],
+                                     df.loc[bad_password, "姓名"]):
+        row_num = idx + 2  # Excel行号（从2开始）
+        errors.append(f"第{row_num}行：初始密码必须至少8位，包含字母+数字")
+        details[idx - base] = ImportResult(row_num, account_id, name, "失败", "初始密码不符合要求")
+    stats["failed"] += int(bad_password.sum())
+    df = df[~bad_password]
+
+    # 未填写初始密码的行一次性批量生成随机密码
+    no_password = df["初始密码"].isna()
+    df.loc[no_password, "初始密码"] = [generate_random_password() for _ in range(int(no_password.sum()))]
+    # 待插入的行及其在details中的位置（第一遍只做校验，第二遍统一批量插入）
+    to_insert = []
+    pending = []
+    # 判重只查询本批账号（走UNIQUE索引），在加密密码之前完成，已存在的账号不做无用的bcrypt计算
+    existing = inserter.existing_accounts(df["学（工）号"].to_numpy())
+
+    # 按列取出后zip逐行遍历，避免iterrows为每行构造Series
+    for idx, account_id, name, role, department, email, password in zip(
+            df.index, df["学（工）号"].to_numpy(), df["姓名"].to_numpy(), df["role_en"].to_numpy(),
+            df["单位"].to_numpy(), df["邮箱"].to_numpy(), df["初始密码"].to_numpy()):
+        row_num = idx + 2  # Excel行号（从2开始）
+
+        # 检查是否已存在（含本批中前面已出现的账号；此前批次已提交，由上面的查询覆盖）
+        if account_id in existing:
+            if not update_existing:
+                stats["duplicate"] += 1
+                details[idx - base] = ImportResult(row_num, account_id, name, "重复", "用户已存在")
+                continue
+            # 已有账号随本批一起UPSERT：只更新基本信息，密码为None表示无需加密（不改动原密码）
+            password = None
+
+        # 加入待插入列表（密码稍后统一加密），插入结果在第二遍回填
+        to_insert.append((account_id, name, role, department, email))
+        pending.append((idx - base, password))
+        existing.add(account_id)
+        details[idx - base] = ImportResult(row_num, account_id, name, "")
+
+    # 第二遍：并行加密新账号的密码后executemany批量写入
+    hashes = iter(_hash_passwords([password for _, password in pending if password is not None], hash_pool))
+    # 待更新行的密码哈希只是占位，UPSERT的更新分支不会使用
+    rows = [(*user, next(hashes) if password is not None else "", "admin_import")
+            for user, (_, password) in zip(to_insert, pending)]
+    # 共享连接在整个事务期间持锁，其他线程的语句不会混入本批事务
+    with connection_lock:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            results = inserter.flush(rows)
+            conn.commit()
+        except Exception:
+            # 只回滚本批，此前批次已提交
+            conn.rollback()
+            raise
+    for (pos, password), ok in zip(pending, results):
+        detail = details[pos]
+        if ok and password is None:
+            stats["updated"] += 1
+            detail.status = "更新"
+        elif ok:
+            stats["success"] += 1
+            detail.status = "成功"
+            detail.password = password  # 返回生成的密码
+        else:
+            stats["failed"] += 1
+            detail.status = "失败"
+            detail.reason = "写入用户失败（数据库错误）"
+    return stats, errors, [detail for detail in details if detail is not None]
+
+
+def _drop_secondary_user_indexes(conn) -> List[str]:
+    """
+    删除users表的非唯一二级索引（account_id的UNIQUE索引用于判重，保留）
+    :return: 重建这些索引的建索引语句
+    """
+    rows = conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'users' AND sql IS NOT NULL"
+    ).fetchall()
+    rebuild = []
+    for name, sql in rows:
+        if sql.lstrip().upper().startswith("CREATE UNIQUE"):
+            continue
+        conn.execute(f'DROP INDEX IF EXISTS "{name}"')
+        rebuild.append(sql)
+    return rebuild
+
+
+def import_users_from_excel(file_path: str, update_existing: bool = False,
+                            chunk_size: int = IMPORT_CHUNK_SIZE, report_path: Optional[str] = None,
+                            defer_indexes: bool = False) -> Dict[str, any]:
+    """
+    从Excel批量导入用户（按批流式读取，每批一个事务）
+    导入按单线程设计：全部批次在调用线程中依次写入共享连接，每批事务期间持有connection_lock（密码加密在进程池中并行，不访问数据库）
+    :param file_path: Excel文件路径（也支持CSV）
+    :param update_existing: 是否更新已存在用户的姓名/身份/单位/邮箱（不改动原密码；False则记为重复）
+    :param chunk_size: 每批处理的行数
+    :param report_path: 明细报告路径（JSONL，每行一条明细，每批提交后写入）；
+                        指定后明细和逐行错误不再保存在内存中，返回值只含统计，适合超大批量导入
+    :param defer_indexes: 仅用于停机维护时的离线导入：导入期间删除users表的非唯一二级索引，结束后重建；
+                          应用运行时不要开启，否则导入期间应用的按角色查询都会全表扫描
     :return: 导入报告
     """
     # 1. 验证文件
-    is_valid, errors, df = validate_excel_file(file_path)
+    is_valid, errors, chunks = validate_excel_file(file_path, chunk_size)
     if not is_valid:
         return {
             "success": False,
             "message": "文件验证失败",
             "errors": errors,
-            "stats": {"total": 0, "success": 0, "failed": 0, "duplicate": 0},
+            "stats": {"total": 0, "success": 0, "failed": 0, "duplicate": 0, "updated": 0},
             "details": []
         }
 
-    # 2. 处理每条记录
-    total = len(df)
-    success_count = 0
-    failed_count = 0
-    duplicate_count = 0
+    # 2. 逐批处理，每批提交后再累计统计和明细（全程使用同一个共享连接）
+    stats = {"total": 0, "success": 0, "failed": 0, "duplicate": 0, "updated": 0}
     details = []
+    rows_read = 0
+    deferred_indexes = None
+    report_file = open(report_path, "w", encoding="utf-8") if report_path else None
+    conn = get_connection()
+    try:
+        # 开启更新时使用UPSERT语句，新增与更新走同一条批量写入路径
+        inserter = BulkInserter(conn, update_existing=update_existing)
+        # 工作进程在首次提交任务时才启动，小批量导入不会产生进程开销
+        with ProcessPoolExecutor() as hash_pool:
+            for df in chunks:
+                # 离线大批量导入时先删除二级索引，避免每行插入都维护索引
+                # （进程中途被终止时索引不会在此重建，auth_system启动时的init_database会补建）
+                rows_read += len(df)
+                if defer_indexes and deferred_indexes is None and rows_read > _DEFER_INDEX_MIN_ROWS:
+                    with connection_lock:
+                        deferred_indexes = _drop_secondary_user_indexes(conn)
+                chunk_stats, chunk_errors, chunk_details = _import_chunk(conn, inserter, df, update_existing, hash_pool)
+                for key, value in chunk_stats.items():
+                    stats[key] += value
+                if report_file is None:
+                    errors.extend(chunk_errors)
+                    details.extend(chunk_details)
+                else:
+                    report_file.writelines(json.dumps(detail.to_dict(), ensure_ascii=False) + "\n"
+                                           for detail in chunk_details)
+                    report_file.flush()
+    except Exception as e:
+        failure = e
+    else:
+        failure = None
+    finally:
+        if report_file is not None:
+            report_file.close()
 
-    for idx, row in df.iterrows():
-        row_num = idx + 2  # Excel行号（从2开始）
-        account_id = str(row["学（工）号"]).strip()
-        name = str(row["姓名"]).strip()
-        role = row["角色类型"].strip().lower()
-        department = str(row["单位"]).strip()
-        email = str(row["邮箱"]).strip()
-        password = row.get("初始密码", generate_random_password())
-
-        # 角色映射（统一为英文）
-        role_map = {"学生": "student", "教师": "teacher", "管理员": "admin"}
-        if role not in role_map:
-            errors.append(f"第{row_num}行：角色类型无效（仅支持学生/教师/管理员）")
-            failed_count += 1
-            details.append({
-                "row": row_num,
-                "account_id": account_id,
-                "name": name,
-                "status": "失败",
-                "reason": "角色类型无效"
-            })
-            continue
-        role = role_map[role]
-
-        # 验证学工号格式
-        if not validate_account_format(account_id, role):
-            errors.append(f"第{row_num}行：{role}学/工号格式错误（学生13位，教师/管理员8位）")
-            failed_count += 1
-            details.append({
-                "row": row_num,
-                "account_id": account_id,
-                "name": name,
-                "status": "失败",
-                "reason": f"{role}学/工号格式错误"
-            })
-            continue
+    # 无论导入是否成功，都重建导入期间删除的索引（共享连接不关闭）；
+    # 重建失败只追加到错误信息中，不掩盖导入本身的错误
+    for sql in deferred_indexes or ():
+        try:
+            with connection_lock:
+                conn.execute(sql)
+        except sqlite3.Error as e:
+            errors.append(f"重建索引失败，请手动执行：{sql}（{str(e)}）")
 
-        # 检查是否已存在
-        if check_account_exists(account_id):
-            if update_existing:
-                # 暂不实现更新逻辑，仅跳过
-                details.append({
-                    "row": row_num,
-                    "account_id": account_id,
-                    "name": name,
-                    "status": "跳过",
-                    "reason": "用户已存在（未开启更新）"
-                })
-            else:
-                duplicate_count += 1
-                details.append({
-                    "row": row_num,
-                    "account_id": account_id,
-                    "name": name,
-                    "status": "重复",
-                    "reason": "用户已存在"
-                })
-            continue
+    if failure is not None:
+        return {
+            "success": False,
+            "message": f"导入中断，当前批次已回滚（此前批次已提交）：{str(failure)}",
+            "errors": errors + [str(failure)],
+            "stats": stats,
+            "details": [detail.to_dict() for detail in details],
+            "report_path": report_path
+        }
 
-        # 创建用户
-        if create_user(
-                account_id=account_id,
-                name=name,
-                role=role,
-                department=department,
-                email=email,
-                password=password,
-                created_by="admin_import"
-        ):
-            success_count += 1
-            details.append({
-                "row": row_num,
-                "account_id": account_id,
-                "name": name,
-                "status": "成功",
-                "reason": "",
-                "password": password  # 返回生成的密码
-            })
-        else:
-            failed_count += 1
-            details.append({
-                "row": row_num,
-                "account_id": account_id,
-                "name": name,
-                "status": "失败",
-                "reason": "创建用户失败（数据库错误）"
-            })
+    if stats["total"] == 0:
+        return {
+            "success": False,
+            "message": "文件验证失败",
+            "errors": errors + ["Excel文件中无有效数据（必填列存在空值）"],
+            "stats": stats,
+            "details": [],
+            "report_path": report_path
+        }
 
     # 3. 生成报告
     return {
         "success": True,
         "message": "导入完成",
         "errors": errors,
-        "stats": {
-            "total": total,
-            "success": success_count,
-            "failed": failed_count,
-            "duplicate": duplicate_count
-        },
-        "details": details
+        "stats": stats,
+        "details": [detail.to_dict() for detail in details],
+        "report_path": report_path
     }
 
 